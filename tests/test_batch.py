@@ -0,0 +1,81 @@
+import numpy as np
+
+from translacc import Stop, Vehicle
+from translacc.batch import detect_departures
+
+LAT, LON = 40.0, -75.0
+N_TRACKS = 300
+
+
+def random_track(rng, n_samples):  # distances of a vehicle going back and forth between the stop and the far end of the route
+    dist = []
+    d = rng.uniform(0, 5000)
+    speed = rng.choice([-1, 1]) * rng.uniform(20, 400)
+    for _ in range(n_samples):
+        dist.append(d)
+        if rng.uniform() < 0.1:  # turn around, wait or jump (eg. missing reports)
+            speed = rng.choice([-1, 1]) * rng.uniform(0, 400)
+        d = abs(d + speed + rng.normal(0, 20))
+        if d > 6000:
+            speed = -abs(speed)
+    return dist
+
+
+def random_day(rng):
+    n_vehicles = rng.randint(1, 4)
+    n_stops = rng.randint(1, 3)
+    n_samples = rng.randint(5, 150)
+    tracks = [random_track(rng, n_samples) for _ in range(n_vehicles)]
+    timestamps = []  # feed order - vehicles interleaved, some reports repeated or out of order
+    ts = 1700000000000
+    for i in range(n_samples):
+        for vid in rng.permutation(n_vehicles):
+            step = rng.choice([0, -5000, rng.randint(1000, 30000)], p=[0.05, 0.05, 0.9])
+            timestamps.append((int(vid), i, ts + int(step) * (1 + vid)))
+        ts += rng.randint(1000, 30000)
+    stop_offsets = [rng.uniform(0, 300) for _ in range(n_stops)]
+    return tracks, timestamps, stop_offsets
+
+
+def run_live(tracks, timestamps, stop_offsets, params, interpolate):  # the collector runs Stop.depart after every new sample
+    stops = [Stop(sid, str(sid), str(sid), [LAT, LON]) for sid in range(len(stop_offsets))]
+    for s in stops:
+        s.set_schedule([], [], [])
+    vehicles = dict()
+    samples = []
+    departures = []
+    for vid, i, ts in timestamps:
+        vehicles.setdefault(vid, Vehicle(vid, 1, str(vid)))
+        if not vehicles[vid].update(ts, None):
+            for sid in range(len(stops)):
+                samples.append((sid, vid, ts, tracks[vid][i] + stop_offsets[sid]))
+            continue
+        for sid, s in enumerate(stops):
+            pos = [LAT + (tracks[vid][i] + stop_offsets[sid]) / 111195.0, LON]
+            dist = s.update(vid, ts, pos)
+            samples.append((sid, vid, ts, dist))
+            for d in s.depart(vid, 100, *params, interpolate):
+                departures.append((sid, vid, d[2], d[1], ts))
+    return samples, departures
+
+
+def test_batch_matches_live():
+    rng = np.random.RandomState(0)
+    for _ in range(N_TRACKS):
+        tracks, timestamps, stop_offsets = random_day(rng)
+        params = (rng.uniform(100, 400), rng.uniform(50, 4000), rng.choice([0, rng.randint(1, 120000)]), rng.uniform(10, 300))
+        interpolate = bool(rng.randint(2))
+        samples, live = run_live(tracks, timestamps, stop_offsets, params, interpolate)
+
+        # the batch detector sees every reported sample - including the ones the collector discards as stale
+        # those carry the distance of the position reported with them which the collector never uses
+        sid, vid, ts, dist = (np.array(x) for x in zip(*samples))
+        res = detect_departures(sid, vid, ts, dist, *params, interpolate=interpolate)
+
+        live.sort(key=lambda x: (x[0], x[1]))  # batch output is grouped by (stop, vehicle) in order of departure
+        assert len(res["sid"]) == len(live)
+        assert [int(x) for x in res["sid"]] == [x[0] for x in live]
+        assert [int(x) for x in res["vid"]] == [x[1] for x in live]
+        assert np.allclose(res["timestamp"], [x[2] for x in live])
+        assert np.allclose(res["dist"], [x[3] for x in live])
+        assert [int(x) for x in res["detected"]] == [x[4] for x in live]
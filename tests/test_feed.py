@@ -0,0 +1,34 @@
+import json
+import shutil
+
+from translacc.feed import FeedArchive
+
+
+def record_unclosed(tmp_path, n=50):  # archive of a recorder killed after flushing - copied while still open
+    archive = FeedArchive(str(tmp_path / "live.jsonl.gz"))
+    for i in range(n):
+        archive.add(i * 1000, "vehicle_statuses", json.dumps({"vehicles": [], "i": i % 5}))
+        archive.flush()
+    fname = str(tmp_path / "killed.jsonl.gz")
+    shutil.copy(archive.fname, fname)
+    archive.close()
+    return fname
+
+
+def test_load_unclosed(tmp_path):
+    archive = FeedArchive(record_unclosed(tmp_path)).load()
+    assert len(archive.records["vehicle_statuses"][0]) == 50
+    assert archive.get("vehicle_statuses", 7000) == json.dumps({"vehicles": [], "i": 2})
+
+
+def test_append_after_unclosed(tmp_path):
+    fname = record_unclosed(tmp_path)
+    archive = FeedArchive(fname)
+    for i in range(10):
+        archive.add(100000 + i * 1000, "vehicle_statuses", json.dumps({"vehicles": [], "i": i % 5}))
+    archive.close()
+
+    lines, truncated = archive.read_lines()
+    assert not truncated
+    assert sum(1 for line in lines if "body" in json.loads(line)) == 5  # bodies of the earlier session are not stored again
+    assert len(FeedArchive(fname).load().records["vehicle_statuses"][0]) == 60
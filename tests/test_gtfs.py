@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+
+from translacc.gtfs import TimetableCache, compile_gtfs
+
+FEED = {
+    "stops.txt": """stop_id,stop_name,stop_code
+S0,Alpha,200
+S1,Alpha,100
+S2,Beta,300
+""",
+    "routes.txt": """route_id,route_short_name,route_long_name
+R1,1,Red Line
+R2,2,Blue Line
+""",
+    "calendar.txt": """service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date
+WK,1,1,1,1,1,0,0,20260101,20261231
+SAT,0,0,0,0,0,1,0,20260101,20261231
+""",
+    # Wednesday 2026-07-08 runs the Saturday service instead of the weekday one
+    "calendar_dates.txt": """service_id,date,exception_type
+WK,20260708,2
+SAT,20260708,1
+""",
+    "trips.txt": """route_id,service_id,trip_id
+R1,WK,r1_morning
+R1,WK,r1_next
+R1,WK,r1_night
+R2,WK,r2_morning
+R1,SAT,r1_sat
+""",
+    # the last stop of every trip is an arrival and is not expected as a departure
+    "stop_times.txt": """trip_id,arrival_time,departure_time,stop_id,stop_sequence
+r1_morning,08:00:00,08:00:00,S1,1
+r1_morning,08:10:00,08:10:00,S2,2
+r1_morning,08:20:00,08:20:00,S1,3
+r1_next,08:20:00,08:20:00,S1,1
+r1_next,08:30:00,08:30:00,S2,2
+r1_night,25:00:00,25:00:00,S1,1
+r1_night,25:10:00,25:10:00,S2,2
+r2_morning,07:55:00,07:55:00,S0,1
+r2_morning,08:00:00,08:00:00,S1,2
+r2_morning,08:15:00,08:15:00,S2,3
+r1_sat,10:00:00,10:00:00,S1,1
+r1_sat,10:10:00,10:10:00,S2,2
+""",
+}
+
+MONDAY = date(2026, 7, 6)
+SATURDAY = date(2026, 7, 11)
+EXCEPTION = date(2026, 7, 8)
+OUT_OF_RANGE = date(2027, 3, 1)
+
+
+@pytest.fixture
+def timetable(tmp_path):
+    gtfs_dir = tmp_path / "gtfs"
+    gtfs_dir.mkdir()
+    for fname, content in FEED.items():
+        (gtfs_dir / fname).write_text(content)
+    compile_gtfs(str(gtfs_dir), str(tmp_path / "cache"))
+    return TimetableCache(str(tmp_path / "cache"))
+
+
+def times(timetable, stop, sdate, route=None):
+    return [int(x) for x in timetable.get_times(stop, sdate, route)]
+
+
+def test_routes_and_trips(timetable):
+    red, blue = timetable.find_route("Red Line"), timetable.find_route("Blue Line")
+    assert times(timetable, 1, MONDAY, red) == [28800, 30000, 90000]  # 08:00, 08:20 and the 25:00 overnight run
+    assert times(timetable, 2, MONDAY, red) == [29400]  # 08:30 and 25:10 end their trips
+    assert times(timetable, 1, MONDAY, blue) == [28800]
+    assert times(timetable, 0, MONDAY, blue) == [28500]
+    assert times(timetable, 1, MONDAY) == [28800, 28800, 30000, 90000]  # trips leaving together are all kept
+
+
+def test_service_days(timetable):
+    red = timetable.find_route("Red Line")
+    assert times(timetable, 1, SATURDAY, red) == [36000]
+    assert times(timetable, 2, SATURDAY, red) == []
+    assert times(timetable, 1, EXCEPTION, red) == [36000]
+    assert times(timetable, 1, OUT_OF_RANGE, red) == []
+
+
+def test_find(timetable):
+    red, blue = timetable.find_route("Red Line"), timetable.find_route("Blue Line")
+    assert (red, blue) == (0, 1)
+    assert timetable.find_route("2") == blue
+    assert timetable.find_route("unknown", "R1") == red
+    assert timetable.find_route("unknown") is None
+
+    assert timetable.find_stop("Alpha", "100", red) == 1
+    assert timetable.find_stop("Alpha", None, red) == 1  # the first "Alpha" is not served by the route
+    assert timetable.find_stop("Alpha", "200", red) == 1
+    assert timetable.find_stop("Alpha", "200") == 0
+    assert timetable.find_stop("Gamma", "300") == 2
+    assert timetable.find_stop("Gamma") is None
+    assert timetable.serves(1, blue) and not timetable.serves(0, red)
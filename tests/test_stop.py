@@ -0,0 +1,74 @@
+import math
+
+from translacc import RouteShape, Stop, Vehicle
+
+LAT, LON = 40.0, -75.0
+SIDE = 1000  # meters
+STEP = 100  # meters between samples
+
+
+def square_loop():  # closed loop starting and ending at the stop - 4 * SIDE meters long
+    dlat = SIDE / 111195.0
+    dlon = SIDE / (111195.0 * math.cos(math.radians(LAT)))
+    return [[LAT, LON], [LAT + dlat, LON], [LAT + dlat, LON + dlon], [LAT, LON + dlon], [LAT, LON]]
+
+
+def position_at(points, along):  # position along the square loop - linear within each side
+    along = along % (4 * SIDE)
+    i = int(along // SIDE)
+    t = (along - i * SIDE) / SIDE
+    a, b = points[i], points[i + 1]
+    return [a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1])]
+
+
+def drive(*legs):  # along-route positions of a vehicle driving from one position to the next one STEP meters at a time
+    res = [legs[0]]
+    for target in legs[1:]:
+        while res[-1] != target:
+            res.append(res[-1] + max(-STEP, min(STEP, target - res[-1])))
+    return res
+
+
+def run_track(shape, alongs):  # departures reported by Stop.depart run after every sample as the collector does
+    points = square_loop()
+    stop = Stop(1, "1", "Stop", points[0])
+    stop.set_schedule([], [], [])
+    vehicle = Vehicle(1, 1, "1")
+    if shape is not None:
+        stop.set_shape(shape)
+
+    departures = []
+    for i, along in enumerate(alongs):
+        pos = position_at(points, along)
+        progress = vehicle.update_progress(shape, pos) if shape is not None else None
+        stop.update(1, i * 10000, pos, progress)
+        departures += stop.depart(1, 100, 250, 3500, 1200, 100)
+    return stop, [d[2] for d in departures]
+
+
+def test_two_laps_with_shape():
+    alongs = drive(0, 8 * SIDE + 500)
+    stop, departures = run_track(RouteShape(square_loop()), alongs)
+    _, no_shape = run_track(None, alongs)
+    assert len(departures) == 3  # leaving the start and completing each lap
+    assert departures == no_shape
+    # samples are trimmed together after each departure
+    assert len(set(len(x) for x in stop.v_distances[1])) == 1
+
+
+def test_backwards_departure():
+    # arrives at the stop, leaves backwards (eg. for a break), comes back and leaves along the route
+    alongs = drive(3 * SIDE, 4 * SIDE, 3 * SIDE, 4 * SIDE + 500)
+    _, departures = run_track(RouteShape(square_loop()), alongs)
+    _, no_shape = run_track(None, alongs)
+    assert len(no_shape) == 2
+    assert departures == no_shape[1:]
+
+
+def test_departure_without_completing_route():
+    # leaves along the route, turns back to the stop and leaves again without going around the loop
+    alongs = drive(3 * SIDE, 4 * SIDE + 600, 4 * SIDE, 4 * SIDE + 600)
+    _, departures = run_track(RouteShape(square_loop()), alongs)
+    _, no_shape = run_track(None, alongs)
+    assert len(no_shape) == 2
+    assert departures == no_shape[:1]
@@ -0,0 +1,6 @@
+from .geo import deg2rad, sphDist, distance, decode_polyline, parse_route_shape, RouteShape
+from .palette import VLAG
+from .schedule import Schedule
+from .vehicle import Vehicle
+from .stop import Stop, crossing_time
+from .collector import Collector
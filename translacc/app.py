@@ -0,0 +1,180 @@
+import os
+import argparse
+
+from .collector import Collector
+from .feed import FEED_URL
+
+collector = None
+
+def generator():
+    global collector
+    hrs = {'data': {'00': [['00:00', 'NA', '#b3b3b3'], ['00:30', 'NA', '#b3b3b3']], '06': [['06:00', 'NA', '#b3b3b3'], ['06:15', 'NA', '#b3b3b3'], ['06:30', 'NA', '#b3b3b3'], ['06:45', 'NA', '#b3b3b3']], '07': [['07:00', 'NA', '#b3b3b3'], ['07:15', 'NA', '#b3b3b3'], ['07:30', 'NA', '#b3b3b3'], ['07:36', 'NA', '#b3b3b3'], ['07:42', 'NA', '#b3b3b3'], ['07:48', 'NA', '#b3b3b3'], ['07:54', 'NA', '#b3b3b3']], '08': [['08:00', 'NA', '#b3b3b3'], ['08:06', 'NA', '#b3b3b3'], ['08:12', 'NA', '#b3b3b3'], ['08:18', 'NA', '#b3b3b3'], ['08:24', 'NA', '#b3b3b3'], ['08:30', 'NA', '#b3b3b3'], ['08:36', 'NA', '#b3b3b3'], ['08:42', 'NA', '#b3b3b3'], ['08:48', 'NA', '#b3b3b3'], ['08:54', 'NA', '#b3b3b3']], '09': [['09:00', 'NA', '#b3b3b3'], ['09:10', 'NA', '#b3b3b3'], ['09:20', 'NA', '#b3b3b3'], ['09:30', 'NA', '#b3b3b3'], ['09:40', 'NA', '#b3b3b3'], ['09:50', 'NA', '#b3b3b3']], '10': [['10:00', 'NA', '#b3b3b3'], ['10:15', 'NA', '#b3b3b3'], ['10:30', 'NA', '#b3b3b3'], ['10:45', 'NA', '#b3b3b3']], '11': [['11:00', 'NA', '#b3b3b3'], ['11:15', 'NA', '#b3b3b3'], ['11:30', 'NA', '#b3b3b3'], ['11:45', 'NA', '#b3b3b3']], '12': [['12:00', 'NA', '#b3b3b3'], ['12:15', 'NA', '#b3b3b3'], ['12:30', 'NA', '#b3b3b3'], ['12:45', 'NA', '#b3b3b3']], '13': [['13:00', 'NA', '#b3b3b3'], ['13:15', 'NA', '#b3b3b3'], ['13:30', 'NA', '#b3b3b3'], ['13:45', 'NA', '#b3b3b3']], '14': [['14:00', 'NA', '#b3b3b3'], ['14:15', 'NA', '#b3b3b3'], ['14:30', 'NA', '#b3b3b3'], ['14:45', 'NA', '#b3b3b3']], '15': [['15:00', 'NA', '#b3b3b3'], ['15:06', 'NA', '#b3b3b3'], ['15:12', 'NA', '#b3b3b3'], ['15:18', 'NA', '#b3b3b3'], ['15:24', 'NA', '#b3b3b3'], ['15:30', 'NA', '#b3b3b3'], ['15:36', 'NA', '#b3b3b3'], ['15:42', 'NA', '#b3b3b3'], ['15:48', 'NA', '#b3b3b3'], ['15:54', 'NA', '#b3b3b3']], '16': [['16:00', 'NA', '#b3b3b3'], ['16:06', 'NA', '#b3b3b3'], ['16:12', 'NA', '#b3b3b3'], ['16:18', 'NA', '#b3b3b3'], ['16:24', 'NA', '#b3b3b3'], ['16:30', 'NA', '#b3b3b3'], ['16:36', 'NA', '#b3b3b3'], ['16:42', 'NA', '#b3b3b3'], ['16:48', 'NA', '#b3b3b3'], ['16:54', 'NA', '#b3b3b3']], '17': [['17:00', 'NA', '#b3b3b3'], ['17:06', 'NA', '#b3b3b3'], ['17:12', 'NA', '#b3b3b3'], ['17:18', 'NA', '#b3b3b3'], ['17:24', 'NA', '#b3b3b3'], ['17:30', 'NA', '#b3b3b3'], ['17:36', 'NA', '#b3b3b3'], ['17:42', 'NA', '#b3b3b3'], ['17:48', 'NA', '#b3b3b3'], ['17:54', 'NA', '#b3b3b3']], '18': [['18:00', 'NA', '#b3b3b3'], ['18:10', 'NA', '#b3b3b3'], ['18:20', 'NA', '#b3b3b3'], ['18:30', 'NA', '#b3b3b3'], ['18:45', 'NA', '#b3b3b3']], '19': [['19:00', 'NA', '#b3b3b3'], ['19:15', 'NA', '#b3b3b3'], ['19:30', 'NA', '#b3b3b3'], ['19:45', 'NA', '#b3b3b3']], '20': [['20:00', 'NA', '#b3b3b3'], ['20:15', 'NA', '#b3b3b3'], ['20:30', 'NA', '#b3b3b3']], '21': [['21:00', 'NA', '#b3b3b3'], ['21:30', 'NA', '#b3b3b3']], '22': [['22:00', 'NA', '#b3b3b3'], ['22:30', 'NA', '#b3b3b3']], '23': [['23:00', 'NA', '#b3b3b3'], ['23:30', 'NA', '#b3b3b3']]}, 'rows': ['00', '06', '07', '08', '09', '10', '11', '12', '13', '14', '15', '16', '17', '18', '19', '20', '21', '22', '23'], 'ncols': 10}
+    while True:
+        json = collector.get_today_json()
+        yield json
+
+def run_collection(args):
+    # slack and flask are only loaded when running the collector
+    from slack import WebClient
+    from flask import Flask, render_template
+
+    if args.slack_url is None:
+        assert "SLACK_BOT_TOKEN" in os.environ, "SLACK_BOT_TOKEN environment variable is not set"
+        sc = WebClient(os.environ["SLACK_BOT_TOKEN"])
+    else:  # eg. the local replay server during load tests - no token needed
+        sc = WebClient(os.environ.get("SLACK_BOT_TOKEN", ""), base_url=args.slack_url)
+
+    if not os.path.exists(args.output):
+        os.mkdir(args.output)
+
+    assert os.path.exists(args.setup), "setup file does not exist: " + args.setup
+
+    global collector
+    collector = Collector(args.setup, args.output, args.feed_url)
+    collector.set_min_distance_to_stop(args.min_dist_to_stop)
+    collector.set_min_distance_between_stops(args.min_dist_between_stops)
+    collector.set_min_time_between_stops(args.min_time_diff)
+    collector.set_stop_radius(args.stop_radius)
+    collector.set_order(args.order)
+    collector.set_day_start(args.service_day_start * 3600)
+    if args.timetable_cache is not None:
+        collector.set_timetable_cache(args.timetable_cache)
+    collector.init_shape(args.route_shape)
+    collector.set_interpolate(args.interpolate)
+    collector.set_late_time(args.late_min)
+    collector.set_permitted_early_departure_time(args.permitted_early_departure_time)
+    collector.set_poll_rate(args.poll_min, args.poll_max, args.poll_pause, args.poll_lead, args.poll_speed)
+    collector.set_slack(sc, args.slack_channel_late,args.slack_channel_depart)
+    collector.start_collecting()
+
+    app = Flask(__name__)
+
+    @app.route('/')
+    def index():
+        return render_template('index.html')
+
+    # genout = generator()  # initate the function out of the scope of update route
+
+    @app.route("/update", methods=['GET'])
+    def update():
+        global collector
+        return collector.get_today_json()
+
+    app.run()
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='''Help Page''')
+    parser.add_argument("-o",
+                        "--output",
+                        required=True,
+                        type=str,
+                        help="Directory in which to store the outputs")
+    parser.add_argument("--setup",
+                        required=True,
+                        type=str,
+                        help="File containing a CSV with the setup to run the app: route_long_name,stop,week,sat,sun")
+    parser.add_argument("--order",
+                        required=False,
+                        default=100,
+                        type=int,
+                        help="How many points on each side to use for the comparison to consider comparator(n, n+x) to be True.")
+    parser.add_argument("--min_time_diff",
+                        required=False,
+                        default=1200,
+                        type=int,
+                        help="Maximum time difference in seconds. Default is 1200 (20 minutes)")
+    parser.add_argument("--min_dist_between_stops",
+                        required=False,
+                        default=3500,
+                        type=int,
+                        help="Minimu distance in meters that must be passed by vehicle between two stops for the route to be counted as completed.")
+    parser.add_argument("--min_dist_to_stop",
+                        required=False,
+                        default=250,
+                        type=int,
+                        help="Minimum distance in meters between the location of the bus and location of the stop for the stop to be counted as reached.")
+    parser.add_argument("--stop_radius",
+                        required=False,
+                        default=100,
+                        type=int,
+                        help="Radius of each stop. The time at which the bus is reported to have departed a stop is calulated as the last time it was within the radius of it's closest position to the stop. For example, if a bus stopped 10 meters past the designated stopping position, once departure has been calulated, the departure will be calulated as the last time the bus was recorded 10+50m away from the stop position.")
+    parser.add_argument("--route_shape",
+                        required=False,
+                        type=str,
+                        default=None,
+                        help="JSON file with the shape of the route: a list of [lat, lon] or a saved response of the feed segments endpoint. Fetched from the feed if not provided. When available, departures in the wrong direction are rejected and min_dist_between_stops is measured along the route.")
+    parser.add_argument("--no_interpolation",
+                        required=False,
+                        action="store_false",
+                        dest="interpolate",
+                        help="Report the timestamp of the last sample within stop_radius as the departure time instead of interpolating the time at which the vehicle crossed stop_radius between the surrounding samples.")
+    parser.add_argument("--timetable_cache",
+                        required=False,
+                        type=str,
+                        default=None,
+                        help="Timetable cache compiled from a GTFS feed with python -m translacc.gtfs. When provided, scheduled departures of the route (matched by long name, short name or id) at each stop (matched by code or name, preferring stops served by the route) are taken from the cache, including holidays and service exceptions, and the week/sat/sun columns of the setup file may be left empty.")
+    parser.add_argument("--service_day_start",
+                        required=False,
+                        type=int,
+                        default=4,
+                        help="Hour at which a new service day starts. Departures and observations before this hour (eg. a 12:30am run) belong to the previous day's service. Default is 4 (4am).")
+    parser.add_argument("--feed_url",
+                        required=False,
+                        type=str,
+                        default=FEED_URL,
+                        help="Base URL of the feed. Point it at a local replay server (python -m translacc.stub) to test against recorded or amplified data. Default is " + FEED_URL)
+    parser.add_argument("--slack_url",
+                        required=False,
+                        type=str,
+                        default=None,
+                        help="Base URL of the slack API. Point it at a local replay server (eg. http://127.0.0.1:8000/api/) to run against recorded or amplified data without posting to real channels. Default is the slack API.")
+    parser.add_argument("--slack_channel_late",
+                        required=True,
+                        type=str,
+                        default=None,
+                        help="Name or ID of the slack channel to which the bot will post about missing departures")
+    parser.add_argument("--slack_channel_depart",
+                        required=True,
+                        type=str,
+                        default=None,
+                        help="Name or ID of the slack channel to which the bot will post about departures")
+    parser.add_argument("--late_min",
+                        required=False,
+                        type=int,
+                        default=5,
+                        help="number of minutes after which to send late notifications to slack. Updates will then arrive every N minutes where N is the value specified by this argument.")
+    parser.add_argument("--permitted_early_departure_time",
+                        required=False,
+                        type=int,
+                        default=1,
+                        help="Bus is allowed to depart this many minutes early without a penalty. If a shuttle departs within this many minutes prior to the scheduled departure - it is considered on time and lateness will not be computed..")
+    parser.add_argument("--poll_min",
+                        required=False,
+                        type=float,
+                        default=1,
+                        help="Shortest interval in seconds between requests to the feed. Used around scheduled departures and when a vehicle is approaching a stop (see poll_speed). Raised to half of the observed vehicle report interval when vehicles report less often.")
+    parser.add_argument("--poll_max",
+                        required=False,
+                        type=float,
+                        default=30,
+                        help="Interval in seconds between requests to the feed when vehicles are active but no departure is due.")
+    parser.add_argument("--poll_pause",
+                        required=False,
+                        type=float,
+                        default=600,
+                        help="Longest interval in seconds between requests to the feed during service gaps when no vehicles are reporting.")
+    parser.add_argument("--poll_lead",
+                        required=False,
+                        type=float,
+                        default=300,
+                        help="Number of seconds before and after each scheduled departure during which the feed is polled every poll_min seconds.")
+    parser.add_argument("--poll_speed",
+                        required=False,
+                        type=float,
+                        default=15,
+                        help="Fastest expected vehicle speed in meters per second. Vehicles within min_dist_to_stop + stop_radius + poll_speed * poll_max meters of a stop are polled every poll_min seconds so that they cannot pass the stop between two slow polls.")
+
+    parser.set_defaults(func=run_collection)
+    args = parser.parse_args()
+    args.func(args)
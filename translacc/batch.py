@@ -0,0 +1,199 @@
+import sys
+import argparse
+import numpy as np
+
+from .stop import interpolate_crossing
+
+# whole-day departure detection on columnar data - eg. log.all.*.csv files written by the collector
+# reproduces Stop.depart as called by the collector after every new sample of a vehicle
+# without the route shape (radial distances only - the shape progress is not part of the logs)
+#
+# Stop.depart run after every sample behaves as a small state machine per (stop, vehicle):
+#   - a sample closer than min_dist_to_stop is "kept" if at least min_time_between_stops passed since the previous sample
+#     or if it is the first sample in the buffer (first of the track or right after a departure emptied the buffer)
+#   - the first sample further than min_dist_to_stop after a kept sample triggers a departure from the last kept sample
+#   - two consecutive kept samples with no far sample between them trigger a departure from the first one
+#     if the largest distance between them is at least min_dist_between_stops
+#   - the departure time is taken where the distance first exceeds the kept distance + stop_radius
+#     among the samples available when the departure was detected
+# all of which can be expressed with masks, forward fills, reduceat and searchsorted over the whole day at once
+
+
+def ffill_idx(mask):  # index of the last True at or before each position (-1 if none)
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+
+
+def detect_departures(sid,
+                      vid,
+                      timestamp,
+                      dist,
+                      min_dist_to_stop,
+                      min_dist_between_stops,
+                      min_time_between_stops,
+                      stop_radius,
+                      interpolate=True):  # returns a dict of arrays: sid, vid, timestamp, dist, detected (one entry per departure)
+    sid = np.asarray(sid)
+    vid = np.asarray(vid)
+    timestamp = np.asarray(timestamp, dtype=np.int64)
+    dist = np.asarray(dist, dtype=float)
+    assert len(sid) == len(vid) == len(timestamp) == len(dist), "all columns must have the same length"
+    if len(sid) == 0:
+        return {"sid": sid, "vid": vid, "timestamp": np.zeros(0), "dist": np.zeros(0), "detected": np.zeros(0, dtype=np.int64)}
+
+    # group by (stop, vehicle) keeping the order in which samples were received
+    order = np.lexsort((np.arange(len(sid)), vid, sid))
+    sid, vid, timestamp, dist = sid[order], vid[order], timestamp[order], dist[order]
+    new_group = np.r_[True, (sid[1:] != sid[:-1]) | (vid[1:] != vid[:-1])]
+    gid = np.cumsum(new_group) - 1
+
+    # Vehicle.update ignores samples not newer than the latest one of the vehicle
+    ts_uniq, ts_rank = np.unique(timestamp, return_inverse=True)
+    ts_key = gid * (len(ts_uniq) + 1) + ts_rank  # later groups always compare greater - running max restarts per group
+    fresh = ts_key > np.r_[-1, np.maximum.accumulate(ts_key)[:-1]]
+    sid, vid, timestamp, dist, new_group, gid = sid[fresh], vid[fresh], timestamp[fresh], dist[fresh], new_group[fresh], gid[fresh]
+
+    n = len(dist)
+    idx = np.arange(n)
+    close = dist < min_dist_to_stop
+    far = dist > min_dist_to_stop
+    gap = np.r_[np.inf, np.diff(timestamp)]
+
+    # kept regardless of what happened before
+    strict = close & (new_group | (gap >= min_time_between_stops))
+    # close right after a far sample but too soon after it - kept only if that far sample triggered a departure
+    after_far = close & ~strict & np.r_[False, far[:-1]] & ~new_group
+
+    # whether a kept sample is waiting for departure after each sample
+    # far samples clear it and kept samples set it - a far sample followed by after_far leaves it as it was before the far sample
+    # since the after_far sample is kept exactly when the state before the far sample was set
+    setter = np.full(n, -1)
+    setter[far & ~np.r_[after_far[1:], False]] = 0
+    setter[strict] = 1
+    setter[new_group & (setter < 0)] = 0
+    waiting = setter[ffill_idx(setter >= 0)] == 1
+    waiting_before = np.r_[False, waiting[:-1]] & ~new_group
+
+    trigger = far & waiting_before
+    kept = strict | (after_far & np.r_[False, trigger[:-1]])
+    last_kept = ffill_idx(kept)
+
+    # departures triggered by leaving the stop
+    exit_detected = idx[trigger]
+    exit_departed = last_kept[exit_detected]
+
+    # departures triggered by two consecutive kept samples
+    kidx = idx[kept]
+    pair_departed = np.zeros(0, dtype=int)
+    pair_detected = np.zeros(0, dtype=int)
+    if len(kidx) > 1:
+        far_count = np.r_[0, np.cumsum(far)]
+        between_max = np.maximum.reduceat(dist, kidx)[:-1]
+        is_pair = (gid[kidx[:-1]] == gid[kidx[1:]]) & \
+                  (far_count[kidx[1:]] == far_count[kidx[:-1]]) & \
+                  (between_max >= min_dist_between_stops)
+        pair_departed = kidx[:-1][is_pair]
+        pair_detected = kidx[1:][is_pair]
+
+    departed = np.r_[exit_departed, pair_departed].astype(int)
+    detected = np.r_[exit_detected, pair_detected].astype(int)
+    srt = np.argsort(departed, kind="stable")
+    departed, detected = departed[srt], detected[srt]
+
+    # first sample beyond the stop radius among the samples available at detection
+    # distances are ranked and each departure gets its own range of keys so a single running max and searchsorted
+    # finds the first sample exceeding the level after each departure
+    level = dist[departed] + stop_radius
+    d_uniq, d_rank = np.unique(dist, return_inverse=True)
+    seg = np.zeros(n, dtype=np.int64)
+    seg[departed] = 1
+    seg = np.cumsum(seg)
+    span = len(d_uniq) + 1
+    running = np.maximum.accumulate(seg * span + d_rank)
+    first_above = np.searchsorted(running, seg[departed] * span + np.searchsorted(d_uniq, level, side="right"), side="left")
+    seg_end = np.r_[departed[1:], n]
+    found = (first_above < seg_end) & (first_above <= detected)
+    last_above = ~found & (dist[detected] > level)  # detection sample starts the next departure's range
+    exit_idx = np.where(found, first_above, np.where(last_above, detected, departed))
+
+    depart_idx = np.where(exit_idx > departed, exit_idx - 1, departed)
+    depart_time = timestamp[depart_idx].astype(float)
+    depart_dist = dist[depart_idx]
+    if interpolate:
+        crossed = exit_idx > departed
+        t0, d0 = timestamp[depart_idx[crossed]].astype(float), dist[depart_idx[crossed]]
+        t1, d1 = timestamp[exit_idx[crossed]].astype(float), dist[exit_idx[crossed]]
+        depart_time[crossed] = interpolate_crossing(t0, d0, t1, d1, level[crossed])
+        depart_dist = np.where(crossed, level, depart_dist)
+
+    return {"sid": sid[departed],
+            "vid": vid[departed],
+            "timestamp": depart_time,
+            "dist": depart_dist,
+            "detected": timestamp[detected]}
+
+
+def load_logs(fnames):  # columns of log.all.*.csv files written by the collector: sid,vid,timestamp,dist,departed
+    data = [np.loadtxt(fname, delimiter=",", ndmin=2) for fname in fnames]
+    data = [x for x in data if x.size > 0]
+    if len(data) == 0:
+        return np.zeros((0, 5))
+    return np.concatenate(data)
+
+
+def run_batch(args):
+    log = load_logs(args.logs)
+    res = detect_departures(log[:, 0].astype(np.int64), log[:, 1].astype(np.int64), log[:, 2].astype(np.int64), log[:, 3],
+                            args.min_dist_to_stop, args.min_dist_between_stops, args.min_time_diff, args.stop_radius,
+                            args.interpolate)
+
+    with open(args.output, "w+") as outFP:
+        outFP.write("sid,vid,timestamp,dist,detected\n")
+        for i in range(len(res["sid"])):
+            outFP.write(",".join([str(res["sid"][i]), str(res["vid"][i]), str(res["timestamp"][i]),
+                                  str(res["dist"][i]), str(res["detected"][i])]) + "\n")
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='''Detect departures from logs of the collector''')
+    parser.add_argument("logs",
+                        nargs="+",
+                        type=str,
+                        help="log.all.*.csv files written by the collector")
+    parser.add_argument("-o",
+                        "--output",
+                        required=True,
+                        type=str,
+                        help="Output CSV with one line per departure: sid,vid,timestamp,dist,detected")
+    parser.add_argument("--min_time_diff",
+                        required=False,
+                        default=1200,
+                        type=int,
+                        help="Same as for the collector.")
+    parser.add_argument("--min_dist_between_stops",
+                        required=False,
+                        default=3500,
+                        type=int,
+                        help="Same as for the collector.")
+    parser.add_argument("--min_dist_to_stop",
+                        required=False,
+                        default=250,
+                        type=int,
+                        help="Same as for the collector.")
+    parser.add_argument("--stop_radius",
+                        required=False,
+                        default=100,
+                        type=int,
+                        help="Same as for the collector.")
+    parser.add_argument("--no_interpolation",
+                        required=False,
+                        action="store_false",
+                        dest="interpolate",
+                        help="Same as for the collector.")
+
+    parser.set_defaults(func=run_batch)
+    args = parser.parse_args(args)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,441 @@
+import os
+import sys
+import json
+import threading
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+
+from .feed import FEED_URL, get_request, get_url
+from .geo import RouteShape, parse_route_shape
+from .service import SERVICE_DAY_START, service_date
+from .stop import Stop
+from .vehicle import Vehicle
+
+class Collector:
+    def __init__(self, setup_fname, outdir, feed_url=FEED_URL):
+        self.setup_fname = setup_fname
+        self.feed_url = feed_url  # base URL of the feed - eg. a local replay server started with python -m translacc.stub
+        self.route_long_name = None
+        self.route_id = None
+        self.last_update_time = datetime.now()
+        self.vehicles = dict()
+        self.stops = dict()
+        self.stop_names = list()
+        self.shape = None
+
+        self.order_n = 100
+        self.min_dist_to_stop = sys.maxsize
+        self.min_dist_between_stops = 0
+        self.min_time_between_stops = 0
+        self.stop_radius = 0
+        self.late_time = 5
+        self.permitted_early_departure_time = 1
+        self.interpolate = True
+
+        # polling - seconds
+        self.poll_min = 1  # fastest rate - used near scheduled departures and when vehicles approach a stop
+        self.poll_max = 30  # rate when vehicles are on the road but nothing is due
+        self.poll_pause = 600  # longest sleep during service gaps with no active vehicles
+        self.poll_lead = 300  # how long before/after a scheduled departure to poll at the fastest rate
+        self.poll_speed = 15  # fastest expected vehicle speed (m/s) - sets how far from a stop a vehicle is considered approaching
+        self.vehicle_timeout = 600  # vehicles not reporting for longer than this are considered inactive
+        self.service_times = (None, [])  # (service date, scheduled departures around it) - rebuilt once per service day
+
+        self.slack_client = None
+        self.slack_channel_late = None
+        self.slack_channel_depart = None
+
+        # initialize output files
+        self.outdir = outdir.rstrip("/") + "/"
+        if not os.path.exists(self.outdir):
+            os.mkdir(self.outdir)
+
+        # state is partitioned by service day - a new day only needs a new partition
+        # old partitions are sealed, flushed and evicted in the background (see rollover)
+        self.day_start = SERVICE_DAY_START
+        self.service_date = service_date(datetime.now(), self.day_start)
+        self.logs = dict()  # service date: open log file
+        self.keep_days = 1  # number of past service days kept after sealing - late departures can still be assigned to them
+
+        # LOGIC
+        self.setup()
+
+        self.observed_late = dict()  # stores times fow which lateness is bein collected - this way we can quickly when an update is required based on the requested number of minutes
+
+    def set_min_distance_to_stop(self, min_distance_to_stop):
+        self.min_dist_to_stop = min_distance_to_stop
+
+    def set_min_distance_between_stops(self, min_dist_between_stops):
+        self.min_dist_between_stops = min_dist_between_stops
+
+    def set_min_time_between_stops(self, min_time_between_stops):
+        self.min_time_between_stops = min_time_between_stops
+
+    def set_stop_radius(self, stop_radius):
+        self.stop_radius = stop_radius
+
+    def set_order(self, order):
+        self.order_n = order
+
+    def set_interpolate(self, interpolate):
+        self.interpolate = interpolate
+
+    def set_late_time(self, late_time):
+        self.late_time = late_time
+
+    def set_permitted_early_departure_time(self,permitted_early_departure_time):
+        self.permitted_early_departure_time = permitted_early_departure_time
+
+    def set_poll_rate(self, poll_min, poll_max, poll_pause, poll_lead, poll_speed=15):
+        assert 0 < poll_min <= poll_max <= poll_pause, "poll intervals must satisfy 0 < poll_min <= poll_max <= poll_pause"
+        self.poll_min = poll_min
+        self.poll_max = poll_max
+        self.poll_pause = poll_pause
+        self.poll_lead = poll_lead
+        self.poll_speed = poll_speed
+
+    def set_slack(self, sc, channel_late,channel_depart):
+        self.slack_client = sc
+        self.slack_channel_late = None if channel_late in ["",None] else channel_late
+        self.slack_channel_depart = None if channel_depart in ["",None] else channel_depart
+
+    def set_day_start(self, day_start):
+        self.day_start = day_start
+        self.service_date = service_date(datetime.now(), self.day_start)
+        self.service_times = (None, [])
+        for sid, s in self.stops.items():
+            s.set_day_start(day_start)
+
+    def set_timetable_cache(self, cache_dir):
+        # scheduled departures of all stops come from the compiled GTFS timetable instead of the setup file
+        from .gtfs import TimetableCache
+        # only trips of the tracked route - other routes serving the same stops would be reported as missing departures
+        timetable = TimetableCache(cache_dir)
+        route = timetable.find_route(self.route_long_name, self.route_id)
+        assert route is not None, "route not found in the timetable cache: " + str(self.route_long_name)
+        for sid, s in self.stops.items():
+            stop = timetable.find_stop(s.get_name(), s.get_code(), route)
+            assert stop is not None, "stop not found in the timetable cache: " + s.get_name()
+            assert timetable.serves(stop, route), "no departures of the route from the stop in the timetable cache: " + s.get_name()
+            s.set_timetable(timetable, stop, route)
+        self.service_times = (None, [])
+
+    def get_log(self, sdate):  # log of all observations of the service day - opened when first needed
+        fp = self.logs.get(sdate)
+        if fp is None:
+            fname = self.outdir + "log.all." + sdate.strftime("%Y%m%d") + ".csv"
+            if os.path.exists(fname):
+                print("log file already exists - appending: " + fname)
+            fp = open(fname, "a")
+            self.logs[sdate] = fp
+        return fp
+
+    def rollover(self, lock, sdate):
+        # O(1) - new observations go to the partition of the new service day
+        # everything else runs in the background so ingestion does not stall at the day boundary
+        old_date = self.service_date
+        self.service_date = sdate
+        threading.Thread(target=self._seal, args=[lock, old_date], daemon=True).start()
+
+    def _seal(self, lock, sdate):
+        evict_before = sdate - timedelta(days=self.keep_days - 1)
+        cutoff = datetime.timestamp(datetime.combine(evict_before, time.min) + timedelta(seconds=self.day_start)) * 1000
+
+        # flush and close logs of past days - a late observation reopens the file for appending
+        with lock:
+            logs = [self.logs.pop(x) for x in list(self.logs) if x <= sdate]
+        for fp in logs:
+            fp.close()
+
+        # each stop and vehicle is handled under a separate short lock so that collection can run in between
+        for sid in list(self.stops):
+            with lock:
+                self.stops[sid].seal(sdate, evict_before)
+                self.stops[sid].prune(cutoff, self.min_dist_to_stop)
+        for vid in list(self.vehicles):
+            with lock:
+                if (self.vehicles[vid].get_last_timestamp() or 0) < cutoff:  # inactive since before the evicted days
+                    del self.vehicles[vid]
+                else:
+                    self.vehicles[vid].prune(cutoff)
+
+        with lock:
+            self.observed_late = {k: v for k, v in self.observed_late.items() if k[1] >= datetime.fromtimestamp(cutoff / 1000)}
+
+    def collect_late(self):
+        res = {}
+
+        for sid, s in self.stops.items():
+            sres = s.get_late()
+            res[sid] = sres
+
+        return res
+
+    def get_today_json(self):
+        res = dict({"stops":[],
+                    "stop_data":dict()})
+        for sid in list(self.stops):
+            res["stops"].append(self.stops[sid].get_name())
+            res["stop_data"][self.stops[sid].get_name()] = self.stops[sid].get_today_json()
+
+        return res
+
+    def get_service_times(self, cur_time):  # sorted union of scheduled departures of all stops from yesterday to tomorrow
+        cur_date = service_date(cur_time, self.day_start)
+        if self.service_times[0] != cur_date:
+            res = set()
+            for day_offset in [-1, 0, 1]:
+                sdate = cur_date + timedelta(days=day_offset)
+                for sid, s in self.stops.items():
+                    res.update(s.get_datetimes(sdate))
+            self.service_times = (cur_date, sorted(res))
+        return self.service_times[1]
+
+    def next_poll_interval(self):
+        # poll fast when a scheduled departure is close or a vehicle is approaching a stop
+        # slow down when vehicles are on the road but nothing is due and pause during service gaps
+        cur_time = datetime.now()
+        active_since = (datetime.timestamp(cur_time) - self.vehicle_timeout) * 1000
+
+        # match the rate at which vehicles actually report - polling faster than that only fetches duplicates
+        fast = self.poll_min
+        active = [v for v in self.vehicles.values() if (v.get_last_timestamp() or 0) >= active_since]
+        intervals = [v.get_report_interval() for v in active]
+        intervals = [x for x in intervals if x is not None and x > 0]
+        if len(intervals) > 0:
+            fast = min(max(self.poll_min, min(intervals) / 2), self.poll_max)
+
+        # a vehicle further than this from every stop is still outside min_dist_to_stop + stop_radius at the next poll
+        # even at the slowest rate - closer than that it is approaching and is polled fast so that the visit is fully sampled
+        approach_dist = self.min_dist_to_stop + self.stop_radius + self.poll_speed * self.poll_max
+        for sid, s in self.stops.items():
+            closest = s.get_closest_distance(active_since)
+            if closest is not None and closest < approach_dist:
+                return fast
+
+        times = self.get_service_times(cur_time)
+        idx = bisect_left(times, cur_time)
+        if idx > 0 and (cur_time - times[idx - 1]).total_seconds() <= self.poll_lead:  # just passed a scheduled departure
+            return fast
+        if idx < len(times):
+            time_to_next = (times[idx] - cur_time).total_seconds()
+            if time_to_next <= self.poll_lead:
+                return fast
+
+        # keep checking regularly while vehicles are on the road or while lateness is still being reported
+        if len(active) > 0 or any(len(lv) > 0 for lv in self.collect_late().values()):
+            return self.poll_max
+
+        if idx < len(times):  # service gap - wake up shortly before the next departure
+            return max(self.poll_max, min(self.poll_pause, time_to_next - self.poll_lead))
+        return self.poll_pause
+
+    def _collecting(self, lock):
+        start_time = datetime.now()
+        try:
+            self._collect(lock)
+        finally:
+            with lock:
+                interval = self.next_poll_interval()
+            elapsed = (datetime.now() - start_time).total_seconds()
+            threading.Timer(max(0, interval - elapsed), self._collecting, [lock]).start()
+
+    def _collect(self, lock):
+        # check if service day passed - if did - start a new partition and clean up the old one in the background
+        cur_date = service_date(datetime.now(), self.day_start)
+        if cur_date != self.service_date:
+            with lock:
+                self.rollover(lock, cur_date)
+
+        url = get_url(self.feed_url, "vehicle_statuses")
+        response = ""
+        try:
+            response = get_request(url)
+        except:
+            print("failed to get status at: " + datetime.today().strftime("%c"))
+            return
+
+        output = response.json()
+
+        if output["success"] is not True:
+            exit(1)
+
+        # for each stop we can now check which buses crossed it and estimate time at which the stop occurred
+        with lock:
+            for v in output["vehicles"]:
+                # check that the vehicle belongs to the correct route
+                if not v["route_id"] == self.route_id:
+                    continue
+
+                # update vehicle positioning if changed
+                self.vehicles.setdefault(v["id"], Vehicle(v["id"], v["route_id"],v["call_name"]))
+                updated = self.vehicles[v["id"]].update(v["timestamp"], v["position"])
+
+                if updated:
+                    sample_date = service_date(datetime.fromtimestamp(v["timestamp"] / 1000), self.day_start)  # overnight runs belong to the previous service day
+                    progress = None
+                    if self.shape is not None:
+                        progress = self.vehicles[v["id"]].update_progress(self.shape, v["position"])
+
+                    for sid in self.stops:
+                        stop_dist = self.stops[sid].update(v["id"], v["timestamp"], v["position"], progress)
+                        departures = self.stops[sid].depart(v["id"], self.order_n, self.min_dist_to_stop,
+                                                            self.min_dist_between_stops, self.min_time_between_stops,
+                                                            self.stop_radius, self.interpolate)  # check if departed - if did mark and edit accordingly - resets the vehicle history for the stop and for the vehicle
+
+                        stop_departed = 0
+                        for d in departures:
+                            # remove lateness before the current departure
+                            self.observed_late = {k: v for k, v in self.observed_late.items() if
+                                                  not (k[0] == sid and k[1] < datetime.fromtimestamp(d[2] / 1000))}
+
+                            stop_departed = 1
+                            message = "{0} : {1} departed at {2} ({3})".format(self.stops[sid].get_name(), v["call_name"], d[0],
+                                                                               d[1])
+                            print(message)
+                            if self.slack_channel_depart is not None:
+                                try:
+                                    result = self.slack_client.chat_postMessage(
+                                        channel=self.slack_channel_depart,
+                                        text=message
+                                    )
+
+                                except:
+                                    print("error posting to slack: " + message)
+
+                        # with lock:
+                        out_line = str(sid) + "," + str(v["id"]) + "," + str(v["timestamp"]) + "," + str(
+                            stop_dist) + "," + str(stop_departed) + "\n"
+                        self.get_log(sample_date).write(out_line)
+
+            # collect lateness info
+            # since it's being collected independent of departures
+            # it can detect when something is behind schedule before a new departure occurs
+            lateness = self.collect_late()
+            for sid, lv in lateness.items():
+                for l in lv:
+                    self.observed_late.setdefault((sid, l[0]), self.late_time)
+                    # it is possible that departure occured before the stop
+                    # eg. we do not want to report lateness for the bus which departed more than 1 minute before its time
+                    # check whether it is time to report lateness
+                    if l[1] >= self.observed_late[(sid, l[0])] * 60 and l[2] >= self.permitted_early_departure_time*60:
+                        self.observed_late[(sid, l[0])] += self.late_time  # increment for the next time
+
+                        hrs = int(l[1] // 3600)
+                        mns = int((l[1] % 3600) // 60)
+                        sec = int(l[1] % 60)
+                        late_message = "{0} : {1} has not departed yet ({2}:{3}:{4}))".format(self.stops[sid].get_name(),
+                                                                                              str(l[0].time()), str(hrs), str(mns),
+                                                                                              str(sec))
+                        print(late_message)
+                        if not self.slack_channel_late is None:
+                            try:
+                                result = self.slack_client.chat_postMessage(
+                                    channel=self.slack_channel_late,
+                                    text=late_message
+                                )
+
+                            except:
+                                print("error posting to slack: " + late_message)
+
+    def start_collecting(self):
+        lock = threading.Lock()
+        self._collecting(lock)
+
+    def setup(self):
+        assert os.path.exists(self.setup_fname), "setup file does not exist: " + self.setup_fname
+        with open(self.setup_fname, "r") as inFP:
+            for line in inFP:
+                if line[0] == "#":  # header line
+                    continue
+
+                lcs = line.strip().split(",")
+                assert len(
+                    lcs) == 5, "incorrect number of columns in the setup file. Expected the following format: route_long_name,stop,week,sat,sun"
+
+                # ROUTE
+                if self.route_long_name is None:
+                    self.route_long_name = lcs[0]
+                    self.init_route()
+                else:
+                    assert self.route_long_name == lcs[
+                        0], "multiple routes are not supported at this time. Please ensure your setup file has a single route name specified in the first column"
+
+                # STOP
+                sid = self.init_stop(lcs[1])
+                self.stops[sid].set_schedule(lcs[2].split(";"), lcs[3].split(";"), lcs[4].split(";"))
+
+    def init_stop(self, stop_name):
+
+        # now get stops using the route ID
+        url = get_url(self.feed_url, "stops")
+        response = get_request(url)
+
+        output = response.json()
+
+        rcv_routes = {r["id"]: r for r in output["routes"]}
+        rcv_stops = {s["id"]: s for s in output["stops"]}
+
+        found_stop = False
+        stop_sid = None
+        for rid, r in rcv_routes.items():
+            if r["id"] == self.route_id:
+                for s in r["stops"]:
+                    if rcv_stops[s]["name"] != stop_name:
+                        continue
+                    else:
+                        self.stops[s] = None
+                        found_stop = True
+                        stop_sid = s
+                        break
+
+        assert found_stop, "didn't find requested stop: " + stop_name
+
+        # lastly add additional information about the stops
+        for sid, s in rcv_stops.items():
+            if s["id"] == stop_sid:
+                self.stops[s["id"]] = Stop(s["id"], s["code"], s["name"], s["position"])
+
+        return stop_sid
+
+    def init_shape(self, shape_fname=None):
+        # load the shape of the route from file if provided - otherwise fetch it from the feed
+        # without a shape departures are detected from radial distances alone
+        if shape_fname is not None:
+            assert os.path.exists(shape_fname), "route shape file does not exist: " + shape_fname
+            with open(shape_fname, "r") as inFP:
+                output = json.load(inFP)
+        else:
+            url = get_url(self.feed_url, "segments") + "&routes=" + str(self.route_id)
+            try:
+                response = get_request(url)
+                output = response.json()
+            except:
+                print("failed to get route shape - direction will not be checked")
+                return
+
+        points = parse_route_shape(output, self.route_id)
+        if points is None:
+            print("route shape is not available - direction will not be checked")
+            return
+
+        self.shape = RouteShape(points)
+        for sid, s in self.stops.items():
+            s.set_shape(self.shape)
+        print("loaded route shape: {0} points, {1} meters".format(len(self.shape.points), int(self.shape.get_length())))
+
+    def init_route(self):
+        url = get_url(self.feed_url, "routes")
+        response = get_request(url)
+
+        output = response.json()
+        assert output["success"] is True, "unsuccessful attempt at getting routes"
+        assert "routes" in output, "incorrect response: " + output
+
+        found_route = False
+        for r in output["routes"]:
+            if r["long_name"] == self.route_long_name:
+                found_route = True
+                self.route_id = r["id"]
+
+        assert found_route, "requested route was not found"
@@ -0,0 +1,106 @@
+import os
+import gzip
+import json
+import hashlib
+from bisect import bisect_right
+
+FEED_URL = "https://feeds.transloc.com/3"
+ENDPOINTS = {"vehicle_statuses": "/vehicle_statuses?agencies=641&include_arrivals=true",
+             "stops": "/stops?agencies=641&include_routes=true",
+             "routes": "/routes?agencies=641&include_arrivals=true",
+             "segments": "/segments?agencies=641"}
+STATIC_ENDPOINTS = ["stops", "routes", "segments"]  # change rarely - recorded once every static_interval seconds
+
+
+def get_request(url):
+    import requests  # only needed for live collection - keeps the detection core quick to import
+    return requests.request("GET", url, headers={}, data={})
+
+
+def get_url(feed_url, endpoint):
+    return feed_url.rstrip("/") + ENDPOINTS[endpoint]
+
+
+# archive of raw feed responses - gzip compressed JSON lines
+# each line is {"t": timestamp in ms, "endpoint": name, "hash": sha1 of the body}
+# the body itself is only stored ("body" key) the first time it is seen - repeated responses (eg. no vehicle moved) cost one short line
+# the archive is flushed after every round - if the recorder is killed before closing it the unterminated tail is dropped on reading
+class FeedArchive:
+    def __init__(self, fname):
+        self.fname = fname
+        self.records = dict()  # endpoint: [[timestamps], [hashes]] - sorted by time
+        self.bodies = dict()  # hash: body
+
+        self.fp = None
+        self.seen = set()
+
+    def read_lines(self):  # complete lines of the archive and whether it ended before the end of the gzip stream
+        res = []
+        try:
+            with gzip.open(self.fname, "rt") as inFP:
+                for line in inFP:
+                    if not line.endswith("\n"):  # cut off mid-line
+                        return res, True
+                    res.append(line)
+        except EOFError:
+            return res, True
+        return res, False
+
+    def load(self):
+        lines, truncated = self.read_lines()
+        if truncated:
+            print("archive was not closed - reading {0} complete records: {1}".format(len(lines), self.fname))
+        for line in lines:
+            rec = json.loads(line)
+            if "body" in rec:
+                self.bodies[rec["hash"]] = rec["body"]
+            self.records.setdefault(rec["endpoint"], [[], []])
+            self.records[rec["endpoint"]][0].append(rec["t"])
+            self.records[rec["endpoint"]][1].append(rec["hash"])
+
+        for endpoint, (tss, hashes) in self.records.items():
+            order = sorted(range(len(tss)), key=lambda i: tss[i])
+            self.records[endpoint] = [[tss[i] for i in order], [hashes[i] for i in order]]
+        return self
+
+    def open(self):  # appending adds a new gzip member - read back as one stream
+        if os.path.exists(self.fname):
+            lines, truncated = self.read_lines()
+            # bodies stored by earlier sessions are not stored again
+            self.seen = set(rec["hash"] for rec in map(json.loads, lines) if "body" in rec)
+            if truncated:  # a member after an unterminated one could not be read - rewrite the complete records first
+                with gzip.open(self.fname + ".tmp", "wt") as outFP:
+                    outFP.writelines(lines)
+                os.replace(self.fname + ".tmp", self.fname)
+        self.fp = gzip.open(self.fname, "at")
+
+    def add(self, timestamp, endpoint, body):
+        if self.fp is None:
+            self.open()
+        rec = {"t": timestamp, "endpoint": endpoint, "hash": hashlib.sha1(body.encode("utf-8")).hexdigest()}
+        if rec["hash"] not in self.seen:
+            self.seen.add(rec["hash"])
+            rec["body"] = body
+        self.fp.write(json.dumps(rec) + "\n")
+
+    def flush(self):
+        if self.fp is not None:
+            self.fp.flush()
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+    def get_endpoints(self):
+        return list(self.records)
+
+    def get_range(self):  # first and last timestamp in the archive
+        tss = [t for tss, hashes in self.records.values() for t in (tss[0], tss[-1])]
+        return min(tss), max(tss)
+
+    def get(self, endpoint, timestamp):  # latest body recorded at or before timestamp - earliest one if none
+        if endpoint not in self.records:
+            return None
+        tss, hashes = self.records[endpoint]
+        return self.bodies[hashes[max(0, bisect_right(tss, timestamp) - 1)]]
@@ -0,0 +1,141 @@
+import math
+import numpy as np
+
+# courtesy of https://www.omnicalculator.com/other/latitude-longitude-distance
+def deg2rad(deg):
+    rad = deg * math.pi / 180.0
+    return rad
+
+def sphDist(lat1, long1, lat2, long2):
+    r = 6371 * 1000
+    dist = 2 * r * np.arcsin(
+        math.sqrt(
+            math.pow(
+                np.sin((lat2 - lat1) / 2.0),
+                2
+            ) +
+            np.cos(lat1) * np.cos(lat2) * math.pow(np.sin((long2 - long1) / 2.0),
+                                                   2)
+        )
+    )
+    return dist
+
+
+def distance(l1, l2):
+    res = sphDist(deg2rad(l1[0]), deg2rad(l1[1]), deg2rad(l2[0]), deg2rad(l2[1]))
+    return res
+
+def decode_polyline(encoded, precision=5):  # decodes an encoded polyline string into a list of [lat, lon]
+    res = []
+    factor = math.pow(10, precision)
+    idx = 0
+    lat = 0
+    lon = 0
+    while idx < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = 0
+            result = 0
+            while True:
+                b = ord(encoded[idx]) - 63
+                idx += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        res.append([lat / factor, lon / factor])
+    return res
+
+def parse_route_shape(data, route_id=None):  # returns a list of [lat, lon] describing the route or None if not available
+    # accepts either a plain list of [lat, lon] or the segments response of the feed
+    if isinstance(data, list):
+        return data
+
+    segments = dict()
+    for seg in data.get("segments", []):
+        points = seg["points"]
+        segments[seg["id"]] = decode_polyline(points) if isinstance(points, str) else points
+
+    order = None  # segments listed for the route in the order of travel - [segment_id, direction]
+    for r in data.get("routes", []):
+        if route_id is None or r["id"] == route_id:
+            order = r["segments"]
+            break
+    if order is None:
+        order = [[sid, "forward"] for sid in segments]
+
+    res = []
+    for seg in order:
+        seg_id, direction = (seg, "forward") if not isinstance(seg, list) else seg
+        if seg_id not in segments:
+            continue
+        points = segments[seg_id] if direction != "backward" else segments[seg_id][::-1]
+        res.extend(points if len(res) == 0 or res[-1] != points[0] else points[1:])
+
+    return res if len(res) > 1 else None
+
+class RouteShape:
+    def __init__(self, points, window_back=100, window_ahead=2000, max_offset=200, closed_dist=50):
+        points = np.array(points, dtype=float)
+        points = points[np.r_[True, np.any(np.diff(points, axis=0) != 0, axis=1)]]  # drop repeated points
+        assert len(points) > 1, "route shape requires at least two distinct points"
+
+        self.points = points
+        self.window_back = window_back  # how far behind the previous position of the vehicle to look for its new position
+        self.window_ahead = window_ahead  # how far ahead of the previous position of the vehicle to look for its new position
+        self.max_offset = max_offset  # if the vehicle is further than this from the route within the window - search the whole route
+        self.closed = distance(points[0], points[-1]) <= closed_dist  # loop routes wrap around
+
+        # local equirectangular projection - precise enough at the scale of a route
+        self.ref = np.array([deg2rad(np.mean(points[:, 0])), deg2rad(np.mean(points[:, 1]))])
+        self.xy = self.to_xy(points)
+        self.ab = np.diff(self.xy, axis=0)
+        self.seg_len2 = np.sum(self.ab * self.ab, axis=1)
+        self.seg_len = np.sqrt(self.seg_len2)
+        self.cum = np.concatenate([[0], np.cumsum(self.seg_len)])  # along-route distance to the start of each segment
+        self.length = self.cum[-1]
+
+    def to_xy(self, positions):
+        r = 6371 * 1000
+        rad = np.radians(np.array(positions, dtype=float))
+        return np.column_stack([r * (rad[..., 1] - self.ref[1]) * np.cos(self.ref[0]),
+                                r * (rad[..., 0] - self.ref[0])])
+
+    def _closest(self, p, idxs):
+        a = self.xy[:-1][idxs]
+        ab = self.ab[idxs]
+        t = np.clip(np.sum((p - a) * ab, axis=1) / self.seg_len2[idxs], 0, 1)
+        d2 = np.sum((a + t[:, None] * ab - p) ** 2, axis=1)
+        i = np.argmin(d2)
+        return idxs[i], t[i], math.sqrt(d2[i])
+
+    def project(self, position, hint=None):  # returns segment index, along-route distance and distance off the route
+        p = self.to_xy([position])[0]
+        all_idxs = np.arange(len(self.ab))
+        seg, t, offset = None, None, None
+        if hint is not None:  # only consider segments close to the previous position - O(log n) to find them
+            lo, hi = hint - self.window_back, hint + self.window_ahead
+            if not self.closed or (lo >= 0 and hi <= self.length):
+                lo_idx = max(0, np.searchsorted(self.cum, lo, side="right") - 1)
+                hi_idx = min(len(self.ab), np.searchsorted(self.cum, hi, side="left"))
+                if hi_idx > lo_idx:
+                    seg, t, offset = self._closest(p, all_idxs[lo_idx:hi_idx])
+            else:  # window wraps around the start of the loop
+                seg, t, offset = self._closest(p, all_idxs[(self.cum[1:] >= lo % self.length) | (self.cum[:-1] <= hi % self.length)])
+
+        if seg is None or offset > self.max_offset:
+            seg, t, offset = self._closest(p, all_idxs)
+
+        return int(seg), float(self.cum[seg] + t * self.seg_len[seg]), offset
+
+    def delta(self, along_from, along_to):  # signed along-route distance from along_from to along_to
+        res = along_to - along_from
+        if self.closed:  # shortest way around the loop
+            res = (res + self.length / 2) % self.length - self.length / 2
+        return res
+
+    def get_length(self):
+        return self.length
@@ -0,0 +1,233 @@
+import os
+import sys
+import csv
+import json
+import argparse
+import numpy as np
+
+# compiled timetable cache built from a GTFS feed (stops.txt, routes.txt, trips.txt, stop_times.txt, calendar.txt, calendar_dates.txt)
+# every array is stored as a separate .npy file so that the cache can be memory-mapped at startup
+#   times.npy           int32  departure times (seconds since midnight of the service day - may exceed 24h for overnight runs)
+#                              sorted within each (stop, route, service) pair - one entry per trip
+#                              the last stop of each trip is left out as vehicles do not depart from it
+#   pair_start.npy      int64  start of each (stop, route, service) pair in times - one extra entry at the end
+#   pair_route.npy      int32  route of each (stop, route, service) pair
+#   pair_service.npy    int32  service of each (stop, route, service) pair
+#   stop_ptr.npy        int64  start of each stop in the pair arrays - one extra entry at the end
+#   service_days.npy    uint8  weekdays on which each service runs - bit 0 is Monday
+#   service_start.npy   int32  first date of each service as YYYYMMDD (0 if only defined by calendar_dates.txt)
+#   service_end.npy     int32  last date of each service as YYYYMMDD
+#   exc_date.npy        int32  dates with exceptions as YYYYMMDD - sorted
+#   exc_service.npy     int32  service of each exception
+#   exc_type.npy        int8   1 - service added for the date (eg. special service), 2 - service removed (eg. holiday)
+#   index.json                 stop ids, names and codes, route ids and names and service ids in the order used by the arrays
+
+ARRAYS = ["times", "pair_start", "pair_route", "pair_service", "stop_ptr",
+          "service_days", "service_start", "service_end",
+          "exc_date", "exc_service", "exc_type"]
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def parse_gtfs_time(tm):  # HH:MM:SS - hours can exceed 23 for trips running past midnight
+    h, m, s = tm.strip().split(":")
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+
+def read_gtfs(gtfs_dir, fname, required=True):
+    path = os.path.join(gtfs_dir, fname)
+    if not os.path.exists(path):
+        assert not required, "missing GTFS file: " + path
+        return []
+    with open(path, "r", encoding="utf-8-sig") as inFP:
+        return list(csv.DictReader(inFP))
+
+
+def compile_gtfs(gtfs_dir, cache_dir):
+    stops = read_gtfs(gtfs_dir, "stops.txt")
+    routes = read_gtfs(gtfs_dir, "routes.txt")
+    trips = read_gtfs(gtfs_dir, "trips.txt")
+    calendar = read_gtfs(gtfs_dir, "calendar.txt", required=False)
+    calendar_dates = read_gtfs(gtfs_dir, "calendar_dates.txt", required=False)
+    assert len(calendar) + len(calendar_dates) > 0, "GTFS feed requires calendar.txt or calendar_dates.txt"
+
+    stop_ids = [s["stop_id"] for s in stops]
+    stop2idx = {s: i for i, s in enumerate(stop_ids)}
+    service_ids = sorted(set([c["service_id"] for c in calendar] + [c["service_id"] for c in calendar_dates]))
+    service2idx = {s: i for i, s in enumerate(service_ids)}
+    route_ids = [r["route_id"] for r in routes]
+    route2idx = {r: i for i, r in enumerate(route_ids)}
+    trip2idx = dict()  # trip: (index, route, service) - only trips with a known route and service
+    for t in trips:
+        if t["service_id"] in service2idx and t["route_id"] in route2idx:
+            trip2idx[t["trip_id"]] = (len(trip2idx), route2idx[t["route_id"]], service2idx[t["service_id"]])
+
+    # stop times - only departures of trips with a known route and service
+    st_trip = []
+    st_seq = []
+    st_stop = []
+    st_route = []
+    st_service = []
+    st_time = []
+    with open(os.path.join(gtfs_dir, "stop_times.txt"), "r", encoding="utf-8-sig") as inFP:
+        for row in csv.DictReader(inFP):
+            trip = trip2idx.get(row["trip_id"])
+            tm = row["departure_time"] or row["arrival_time"]
+            if trip is None or tm.strip() == "":  # untimed stop
+                continue
+            st_trip.append(trip[0])
+            st_seq.append(int(row["stop_sequence"]))
+            st_stop.append(stop2idx[row["stop_id"]])
+            st_route.append(trip[1])
+            st_service.append(trip[2])
+            st_time.append(parse_gtfs_time(tm))
+
+    st_trip = np.array(st_trip, dtype=np.int64)
+    st_seq = np.array(st_seq, dtype=np.int64)
+    st_stop = np.array(st_stop, dtype=np.int64)
+    st_route = np.array(st_route, dtype=np.int64)
+    st_service = np.array(st_service, dtype=np.int64)
+    times = np.array(st_time, dtype=np.int32)
+
+    # drop the last stop of each trip - on loop routes it coincides with the first stop of the next trip
+    if len(times) > 0:
+        last_seq = np.full(len(trip2idx), -1, dtype=np.int64)
+        np.maximum.at(last_seq, st_trip, st_seq)
+        departs = st_seq < last_seq[st_trip]
+        st_stop, st_route, st_service, times = st_stop[departs], st_route[departs], st_service[departs], times[departs]
+
+    order = np.lexsort((times, st_service, st_route, st_stop))
+    st_stop, st_route, st_service, times = st_stop[order], st_route[order], st_service[order], times[order]
+
+    # one entry per (stop, route, service) pair
+    new_pair = np.r_[True, (st_stop[1:] != st_stop[:-1]) | (st_route[1:] != st_route[:-1]) | (st_service[1:] != st_service[:-1])] if len(times) > 0 else np.zeros(0, dtype=bool)
+    pair_idx = np.flatnonzero(new_pair)
+    pair_start = np.r_[pair_idx, len(times)].astype(np.int64)
+    pair_route = st_route[pair_idx].astype(np.int32)
+    pair_service = st_service[pair_idx].astype(np.int32)
+    stop_ptr = np.searchsorted(st_stop[pair_idx], np.arange(len(stop_ids) + 1)).astype(np.int64)
+
+    service_days = np.zeros(len(service_ids), dtype=np.uint8)
+    service_start = np.zeros(len(service_ids), dtype=np.int32)
+    service_end = np.zeros(len(service_ids), dtype=np.int32)
+    for c in calendar:
+        i = service2idx[c["service_id"]]
+        service_days[i] = sum(1 << wi for wi, wd in enumerate(WEEKDAYS) if c[wd].strip() == "1")
+        service_start[i] = int(c["start_date"])
+        service_end[i] = int(c["end_date"])
+
+    exc = sorted([(int(c["date"]), service2idx[c["service_id"]], int(c["exception_type"])) for c in calendar_dates])
+    exc_date = np.array([x[0] for x in exc], dtype=np.int32)
+    exc_service = np.array([x[1] for x in exc], dtype=np.int32)
+    exc_type = np.array([x[2] for x in exc], dtype=np.int8)
+
+    if not os.path.exists(cache_dir):
+        os.mkdir(cache_dir)
+    data = {"times": times, "pair_start": pair_start, "pair_route": pair_route, "pair_service": pair_service, "stop_ptr": stop_ptr,
+            "service_days": service_days, "service_start": service_start, "service_end": service_end,
+            "exc_date": exc_date, "exc_service": exc_service, "exc_type": exc_type}
+    for name in ARRAYS:
+        np.save(os.path.join(cache_dir, name + ".npy"), data[name])
+    with open(os.path.join(cache_dir, "index.json"), "w+") as outFP:
+        json.dump({"stop_ids": stop_ids,
+                   "stop_names": [s.get("stop_name", "") for s in stops],
+                   "stop_codes": [s.get("stop_code", "") for s in stops],
+                   "route_ids": route_ids,
+                   "route_long_names": [r.get("route_long_name", "") for r in routes],
+                   "route_short_names": [r.get("route_short_name", "") for r in routes],
+                   "service_ids": service_ids}, outFP)
+
+    return len(stop_ids), len(route_ids), len(service_ids), len(times)
+
+
+class TimetableCache:
+    def __init__(self, cache_dir):
+        assert os.path.exists(os.path.join(cache_dir, "index.json")), "timetable cache does not exist: " + cache_dir
+        assert all(os.path.exists(os.path.join(cache_dir, name + ".npy")) for name in ARRAYS), \
+            "timetable cache is incomplete or was compiled by an older version - rebuild it: " + cache_dir
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(cache_dir, name + ".npy"), mmap_mode="r"))
+        with open(os.path.join(cache_dir, "index.json"), "r") as inFP:
+            index = json.load(inFP)
+        self.stop_ids = index["stop_ids"]
+        self.stop_names = index["stop_names"]
+        self.stop_codes = index["stop_codes"]
+        self.route_ids = index["route_ids"]
+        self.route_long_names = index["route_long_names"]
+        self.route_short_names = index["route_short_names"]
+        self.service_ids = index["service_ids"]
+
+        self.day_times = dict()  # (stop, active pairs): departures - shared by all days with the same services
+
+    def find_stop(self, name, code=None, route=None):  # index of the stop by code - falls back to the stop name
+        # names are often shared by both directions or platforms of a stop - prefer the one served by the route
+        candidates = []
+        if code is not None and str(code) != "":
+            candidates += [i for i, x in enumerate(self.stop_codes) if x == str(code)]
+        candidates += [i for i, x in enumerate(self.stop_names) if x == name]
+        if len(candidates) == 0:
+            return None
+        if route is not None:
+            for i in candidates:
+                if self.serves(i, route):
+                    return i
+        return candidates[0]
+
+    def serves(self, stop, route):  # whether any trip of the route departs from the stop
+        return bool(np.any(self.pair_route[self.stop_ptr[stop]:self.stop_ptr[stop + 1]] == route))
+
+    def find_route(self, long_name, route_id=None):  # index of the route by long name - falls back to the short name and route id
+        if long_name in self.route_long_names:
+            return self.route_long_names.index(long_name)
+        if long_name in self.route_short_names:
+            return self.route_short_names.index(long_name)
+        if route_id is not None and str(route_id) in self.route_ids:
+            return self.route_ids.index(str(route_id))
+        return None
+
+    def get_services(self, sdate):  # indices of services running on the date including exceptions
+        d = int(sdate.strftime("%Y%m%d"))
+        active = (((self.service_days >> sdate.weekday()) & 1) == 1) & (self.service_start <= d) & (d <= self.service_end)
+        lo, hi = np.searchsorted(self.exc_date, [d, d + 1])
+        for service, exc_type in zip(self.exc_service[lo:hi], self.exc_type[lo:hi]):
+            active[service] = exc_type == 1
+        return np.flatnonzero(active)
+
+    def get_times(self, stop, sdate, route=None):  # sorted departures from the stop on the service date - seconds since its midnight
+        # only departures of the route if given - one per trip so that trips leaving at the same time are all expected
+        lo, hi = self.stop_ptr[stop], self.stop_ptr[stop + 1]
+        active = np.isin(self.pair_service[lo:hi], self.get_services(sdate))
+        if route is not None:
+            active &= self.pair_route[lo:hi] == route
+        pairs = lo + np.flatnonzero(active)
+        key = (stop, tuple(pairs))
+        if key not in self.day_times:
+            if len(pairs) == 0:
+                self.day_times[key] = np.zeros(0, dtype=np.int32)
+            else:
+                self.day_times[key] = np.sort(np.concatenate([self.times[self.pair_start[p]:self.pair_start[p + 1]] for p in pairs]))
+        return self.day_times[key]
+
+
+def run_compile(args):
+    n_stops, n_routes, n_services, n_times = compile_gtfs(args.gtfs, args.output)
+    print("compiled {0} stop times for {1} stops, {2} routes and {3} services into {4}".format(n_times, n_stops, n_routes, n_services, args.output))
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='''Compile a GTFS feed into a timetable cache''')
+    parser.add_argument("gtfs",
+                        type=str,
+                        help="Directory with the GTFS feed: stops.txt, routes.txt, trips.txt, stop_times.txt and calendar.txt and/or calendar_dates.txt")
+    parser.add_argument("-o",
+                        "--output",
+                        required=True,
+                        type=str,
+                        help="Directory in which to store the timetable cache")
+
+    parser.set_defaults(func=run_compile)
+    args = parser.parse_args(args)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
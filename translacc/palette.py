@@ -0,0 +1,13 @@
+# colors - blue to red - blue means departed early - red means departed late
+# 61 entries - one for each minute offset from -30 to +30
+# precomputed from seaborn.color_palette("vlag", 61).as_hex() so that seaborn is not required at runtime
+VLAG = (
+    "#2f6ebc", "#3972bc", "#4276bc", "#4a7bbc", "#517fbc", "#5983bd", "#6087bd", "#698cbe",
+    "#6f91bf", "#7695c1", "#7d99c2", "#839dc4", "#8aa2c5", "#90a6c7", "#97abc9", "#9fb0cc",
+    "#a5b5ce", "#abb9d0", "#b2bed3", "#b8c3d5", "#bfc8d8", "#c5cddb", "#cbd1de", "#d4d8e2",
+    "#dadde5", "#e1e2e9", "#e7e7ec", "#eeedf0", "#f3f1f3", "#f8f4f5", "#faf5f4", "#faf3f2",
+    "#f9eeed", "#f6e8e7", "#f3e2e0", "#f0dbda", "#edd5d3", "#eacfcd", "#e7c7c5", "#e4c0be",
+    "#e1bab8", "#dfb4b2", "#dcaeab", "#daa8a5", "#d7a29f", "#d59c99", "#d29491", "#cf8e8b",
+    "#cd8885", "#ca827f", "#c87c7a", "#c57674", "#c3706e", "#c06a68", "#bd6361", "#ba5d5c",
+    "#b75756", "#b55151", "#b24a4b", "#af4446", "#ac3e40",
+)
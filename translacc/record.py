@@ -0,0 +1,71 @@
+import sys
+import time
+import signal
+import argparse
+from datetime import datetime
+
+from .feed import FEED_URL, STATIC_ENDPOINTS, FeedArchive, get_request, get_url
+
+
+def record(archive, feed_url, interval, static_interval):
+    last_static = None
+    while True:
+        start_time = time.time()
+        endpoints = ["vehicle_statuses"]
+        if last_static is None or start_time - last_static >= static_interval:
+            endpoints += STATIC_ENDPOINTS
+            last_static = start_time
+
+        for endpoint in endpoints:
+            try:
+                response = get_request(get_url(feed_url, endpoint))
+            except:
+                print("failed to get " + endpoint + " at: " + datetime.today().strftime("%c"))
+                continue
+            archive.add(int(start_time * 1000), endpoint, response.text)
+        archive.flush()
+
+        time.sleep(max(0, interval - (time.time() - start_time)))
+
+
+def run_record(args):
+    archive = FeedArchive(args.output)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))  # eg. systemd or timeout - close the archive on the way out
+    try:
+        record(archive, args.feed_url, args.interval, args.static_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        archive.close()
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='''Record raw responses of the feed''')
+    parser.add_argument("-o",
+                        "--output",
+                        required=True,
+                        type=str,
+                        help="Archive file (gzip compressed JSON lines). Appended to if it exists.")
+    parser.add_argument("--feed_url",
+                        required=False,
+                        type=str,
+                        default=FEED_URL,
+                        help="Base URL of the feed. Default is " + FEED_URL)
+    parser.add_argument("--interval",
+                        required=False,
+                        type=float,
+                        default=1,
+                        help="Number of seconds between requests for vehicle statuses.")
+    parser.add_argument("--static_interval",
+                        required=False,
+                        type=float,
+                        default=3600,
+                        help="Number of seconds between requests for stops, routes and segments.")
+
+    parser.set_defaults(func=run_record)
+    args = parser.parse_args(args)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,203 @@
+import numpy as np
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from .palette import VLAG
+from .service import SERVICE_DAY_START, ServiceDay, service_date, service_offset
+
+def scale_val(v, min_new, max_new, min_cur, max_cur):
+    return (max_new - min_new) * (v - min_cur) / (max_cur - min_cur) + min_new;
+
+class Schedule:
+    def __init__(self, week, sat, sun, day_start=SERVICE_DAY_START):
+        self.FMT = '%I:%M%p'
+
+        self.week = self.parse_times(week)
+        self.sat = self.parse_times(sat)
+        self.sun = self.parse_times(sun)
+
+        self.days = dict()  # service date: ServiceDay - created when first needed and evicted once sealed
+        self.timetable = None  # compiled timetable cache - replaces the weekly times when set
+        self.timetable_stop = None
+        self.timetable_route = None
+        self.set_day_start(day_start)
+
+        self.last_departure = datetime.timestamp(datetime.now())
+
+    def set_day_start(self, day_start):
+        self.day_start = day_start
+        # scheduled departures for each weekday as seconds since midnight of the service day
+        week = tuple(sorted(service_offset(x, day_start) for x in self.week))
+        sat = tuple(sorted(service_offset(x, day_start) for x in self.sat))
+        sun = tuple(sorted(service_offset(x, day_start) for x in self.sun))
+        self.templates = [week, week, week, week, week, sat, sun]
+        self.days = dict()
+
+    def set_timetable(self, timetable, stop, route=None):
+        self.timetable = timetable
+        self.timetable_stop = stop
+        self.timetable_route = route
+        self.days = dict()
+
+    def get_times(self, sdate):  # scheduled departures of the service day as seconds since its midnight
+        if self.timetable is not None:
+            return self.timetable.get_times(self.timetable_stop, sdate, self.timetable_route)
+        return self.templates[sdate.weekday()]
+
+    def get_day(self, sdate):  # the timetable is shared with all days of the same type
+        day = self.days.get(sdate)
+        if day is None:
+            day = ServiceDay(sdate, self.get_times(sdate))
+            self.days[sdate] = day
+        return day
+
+    def get_today(self):
+        return self.get_day(service_date(datetime.now(), self.day_start))
+
+    # seal and evict run in the background while the dashboard may create the partition of a new day without the collector lock
+    # so they iterate over a copy of the days
+    def seal(self, sdate):  # no more observations are expected for days up to and including sdate
+        for x, d in list(self.days.items()):
+            if x <= sdate:
+                d.seal()
+
+    def evict(self, before_date):  # remove sealed days before the date
+        for sdate in [x for x, d in list(self.days.items()) if x < before_date and d.sealed]:
+            self.days.pop(sdate, None)
+
+    def get_last_departure(self):
+        return self.last_departure
+
+    def get_datetimes(self, sdate):
+        return self.get_day(sdate).get_datetimes()
+
+    def get_today_json(self):
+        res = dict({"data": dict()})
+        cur_time = datetime.now()
+        today = self.get_today()
+        for vi in range(len(today)):
+            v0_datetime = today.get_datetime(vi)
+            observed = today.get_observed(vi)
+            str_time = v0_datetime.strftime("%H:%M")
+            str_hr = v0_datetime.strftime("%H")
+            res["data"].setdefault(str_hr, [])
+
+            # get number of minutes from the previous stop and number of minutes to the next stop
+            min_bound = -30
+            max_bound = 30
+            if vi>0: # there are stops before this
+                vim1_datetime = today.get_datetime(vi-1)
+                stop_diff = int((vim1_datetime - v0_datetime).total_seconds()/60)
+                min_bound = max(min_bound,stop_diff)
+            if vi<len(today)-1: # there are stops after this
+                vip1_datetime = today.get_datetime(vi+1)
+                stop_diff = int((vip1_datetime - v0_datetime).total_seconds()/60)
+                max_bound = min(max_bound,stop_diff)
+
+            # scale the values to -30/+30
+
+            past_schedule = int((cur_time - v0_datetime).total_seconds()/60)
+            if past_schedule < 0:
+                past_schedule = max([min_bound, past_schedule])
+                past_schedule = int(scale_val(past_schedule,-30,0,min_bound,0))
+            if past_schedule > 0:
+                past_schedule = min(max_bound, past_schedule)
+                past_schedule = int(scale_val(past_schedule, 0, 30, 0, max_bound))
+
+            closest_str = "NA"
+            color = '#b3b3b3'
+            if len(observed) == 0  and past_schedule > 0:
+                color = VLAG[past_schedule+30]
+
+            if len(observed) > 0:
+                # get the closest value to the stop time
+                idx = np.argmin([abs(x - v0_datetime).total_seconds() for x in observed])
+                closest = observed[idx]
+                closest_off = int((closest - v0_datetime).total_seconds() / 60)
+
+                # set min max bounds
+                if closest_off < 0:
+                    if past_schedule > 0 and abs(past_schedule) < abs(closest_off): # past schedule is closer than the nearest departure in the past - report this
+                        closest_off = past_schedule
+                    else:
+                        closest_off = max([min_bound, closest_off])
+                        closest_off = int(scale_val(closest_off,-30,0,min_bound,0)) # normalize
+
+                if closest_off > 0:
+                    closest_off = min(max_bound, closest_off)
+                    closest_off = int(scale_val(closest_off,0,30,0,max_bound)) # normalize
+
+                closest_str = closest.strftime("%H:%M")
+                color = VLAG[closest_off+30]
+
+            res["data"][str_hr].append([str_time, closest_str, color])
+
+        res["rows"] = list(res["data"])  # one row for each hour - in service day order so overnight runs come last
+        res["ncols"] = max([len(v) for k, v in res["data"].items()], default=0)
+
+        return res
+
+    def parse_times(self, tms):
+        res = []
+        for x in tms:
+            if x.strip() == "":  # no times - eg. when the timetable comes from a GTFS cache
+                continue
+            st = datetime.strptime(x, self.FMT)
+            tst = datetime.time(st)
+            res.append(tst)
+
+        return sorted(res)
+
+    # colors - blue to red (black when not yet available) - blue means departed early - red means departed late
+    def add_departure(self, vid, timestamp):
+        # what if we simply assign the same departure to multiple stops? and then report the one which minimizes absolute difference?
+
+        # departure is observed
+        # does the last stop before the departure have a departure associated with it?
+        # assign to both previous and next stop
+        # departures after midnight but before the start of the service day belong to the previous service day
+        tm = datetime.fromtimestamp(timestamp / 1000)
+        self.last_departure = max(self.last_departure,timestamp/1000)
+
+        sdate = service_date(tm, self.day_start)
+        day = self.get_day(sdate)
+        next_idx = bisect_right(day.times, day.get_offset(tm))  # first scheduled departure after the observed one
+
+        if next_idx < len(day):
+            day.add_observed(next_idx, tm)
+            if next_idx > 0:
+                day.add_observed(next_idx - 1, tm)
+
+        # if the first of the day - need to add to the previous days last stop
+        if next_idx == 0:
+            yesterday = self.get_day(sdate - timedelta(days=1))
+            if len(yesterday) > 0:
+                yesterday.add_observed(len(yesterday) - 1, tm)
+
+        # if the last of the day - need to add to the next days first stop
+        if next_idx == len(day):
+            tomorrow = self.get_day(sdate + timedelta(days=1))
+            if len(tomorrow) > 0:
+                tomorrow.add_observed(0, tm)
+
+        return
+
+    def get_late(self):
+        res = []
+        cnow = datetime.now()
+        today = self.get_today()
+        for i in range(len(today)):
+            stop_time = today.get_datetime(i)
+            if datetime.timestamp(stop_time) < self.last_departure:  # not interested anymore - values will not update anymore since before the latest departure
+                continue
+            if stop_time > cnow:  # found stop after the current time - no need to look further
+                break
+
+            td = (cnow - stop_time).total_seconds()
+
+            # also compute time since last departure
+            tdld = (stop_time-datetime.fromtimestamp(self.last_departure)).total_seconds()
+
+            res.append([stop_time, abs(td), abs(tdld)])
+
+        return res
@@ -0,0 +1,42 @@
+from datetime import datetime, time, timedelta
+
+SERVICE_DAY_START = 4 * 3600  # seconds after midnight at which a new service day starts - runs before that belong to the previous day
+
+def service_date(dt, day_start=SERVICE_DAY_START):  # service day to which a moment belongs
+    return (dt - timedelta(seconds=day_start)).date()
+
+def service_offset(tm, day_start=SERVICE_DAY_START):  # seconds since midnight of the service day for a time of day
+    res = tm.hour * 3600 + tm.minute * 60 + tm.second
+    if res < day_start:  # overnight run - past midnight of the service day
+        res += 24 * 3600
+    return res
+
+
+class ServiceDay:
+    def __init__(self, sdate, times):
+        self.date = sdate
+        self.midnight = datetime.combine(sdate, time.min)
+        self.times = times  # scheduled departures - seconds since midnight of the service day - shared between days
+        self.observed = dict()  # index of the scheduled departure: observed departures assigned to it
+        self.sealed = False  # set once the day is over - the day is kept only to receive late assignments
+
+    def __len__(self):
+        return len(self.times)
+
+    def get_datetime(self, i):
+        return self.midnight + timedelta(seconds=int(self.times[i]))
+
+    def get_datetimes(self):
+        return [self.get_datetime(i) for i in range(len(self.times))]
+
+    def get_offset(self, dt):
+        return (dt - self.midnight).total_seconds()
+
+    def get_observed(self, i):
+        return self.observed.get(i, [])
+
+    def add_observed(self, i, dt):
+        self.observed.setdefault(i, []).append(dt)
+
+    def seal(self):
+        self.sealed = True
@@ -0,0 +1,261 @@
+import sys
+import numpy as np
+from bisect import bisect_left
+from itertools import product
+from datetime import datetime, date
+
+from .geo import distance
+from .schedule import Schedule
+
+def interpolate_crossing(t0, d0, t1, d1, level):  # works on scalars as well as on arrays of sample pairs
+    # linear interpolation of the distance-time curve between the last sample within level and the first one outside of it
+    return (t1 - t0) / (d1 - d0) * (level - d0) + t0
+
+def crossing_time(timestamps, dists, idx, level):  # time at which the distance crossed level between samples idx and idx+1
+    return float(interpolate_crossing(float(timestamps[idx]), float(dists[idx]), float(timestamps[idx + 1]), float(dists[idx + 1]), level))
+
+class Stop:
+    def __init__(self, id, code, name, position):
+        self.id = id
+        self.code = code
+        self.name = name
+        self.position = position
+        self.schedule = None
+        self.observed_departures = list()
+        self.v_distances = dict()  # vid: [timestamps, distances, along-route progress]
+
+        self.shape = None
+        self.departure_progress = dict()  # along-route progress of each vehicle at its last departure from this stop
+
+        self.last_stop = 0  # indicates the index of the last stop from the schedule which occurred
+
+    def update(self, vid, timestamp, vpos, progress=None):
+        self.v_distances.setdefault(vid, [[], [], []])
+        self.v_distances[vid][0].append(timestamp)
+        self.v_distances[vid][1].append(distance(vpos, self.position))
+        self.v_distances[vid][2].append(progress)
+
+        return self.v_distances[vid][1][-1]
+
+    def get_closest_distance(self, since):  # smallest last known distance among vehicles reported after since (ms)
+        res = None
+        for vid, data in self.v_distances.items():
+            if len(data[0]) == 0 or data[0][-1] < since:
+                continue
+            if res is None or data[1][-1] < res:
+                res = data[1][-1]
+        return res
+
+    def forward_departure(self, vid, c, exit_idx, min_dist_between_stops):
+        # the vehicle must leave the stop moving along the route and not back towards the previous stop (eg. leaving for a break)
+        # and must have travelled at least min_dist_between_stops along the route since its last departure from this stop
+        progress = self.v_distances[vid][2]
+        if progress[exit_idx] <= progress[c]:
+            return False
+        last_progress = self.departure_progress.get(vid)
+        return last_progress is None or progress[c] - last_progress >= min_dist_between_stops
+
+    def time_diff(self, t1, t2, min_diff=0):  # returns true if two values differ by more min_diff number of seconds
+        return
+
+    def depart(self,
+               vid,  # vehicle ID
+               order_n,  #
+               min_dist_to_stop,
+               min_dist_between_stops,
+               min_time_between_stops,
+               stop_radius,
+               interpolate=True):  # returns 0 if no new departure detected - returns 1 if there is departure
+        assert vid in self.v_distances, "requested vehicle is not available"
+
+        # todo: why do we even need this? find local minima etc
+        # tmp_indices_1 = argrelextrema(np.array(self.v_distances[vid][1]), np.less_equal, order=order_n)[0]  # todo: replace container list with np.array to avoid conversions
+        # select all that are also closer than min distance
+        tmp_indices_2 = [i for i,c in enumerate(self.v_distances[vid][1]) if c < min_dist_to_stop]
+
+        # remove duplicates close in time
+        close_dist_indices = []
+        for ci in tmp_indices_2:
+            if ci>=len(self.v_distances[vid][0]):
+                print("wrong index")
+            if any(abs(self.v_distances[vid][0][ci] - timestamp_b) < min_time_between_stops for timestamp_b in
+                   self.v_distances[vid][0][:ci]):
+                continue
+            close_dist_indices.append(ci)
+
+
+        # we also need to make sure that the departure is in the correct direction
+        # eg. if the shuttle left for break in the wrong direction - we do not want to report it
+        # when the route shape is known - this is detected from the along-route progress of the vehicle (see forward_departure)
+        # otherwise only the radial distance to the stop is available and direction is not checked
+
+        # make sure appropriate distance has been travelled or that the bus departed if the first in the day
+        indices = []
+        found_stop = 0
+        trim_to_idx = 0  # index to which the observations are to be trimmed if stops found
+        for i, c in enumerate(close_dist_indices):
+            if i == len(close_dist_indices) - 1:  # last one
+                remaining_dists = self.v_distances[vid][1][c:]
+                if len(remaining_dists) > 0 and max(
+                        remaining_dists) > min_dist_to_stop:  # departed from last observation
+                    found_stop = 1  # even if rejected below - the visit is over and observations can be discarded
+                    trim_to_idx = len(self.v_distances[vid][1])
+                    if self.shape is not None:
+                        exit_idx = c + int(np.argmax(np.array(remaining_dists) > min_dist_to_stop))
+                        if not self.forward_departure(vid, c, exit_idx, min_dist_between_stops):
+                            continue
+                    indices.append(c)
+            elif self.shape is not None:
+                # distance travelled along the route between current and next index
+                next_c = close_dist_indices[i + 1]
+                if self.v_distances[vid][2][next_c] - self.v_distances[vid][2][c] >= min_dist_between_stops:
+                    found_stop = 1
+                    trim_to_idx = next_c
+                    # net forward progress does not rule out leaving backwards and coming around again - check the exit as well
+                    # the exit is the first sample outside of the stop or the next close sample if none was reported in between
+                    exit_idx = c + 1 + int(np.argmax(np.array(self.v_distances[vid][1][c + 1:next_c] + [sys.maxsize]) > min_dist_to_stop))
+                    if not self.forward_departure(vid, c, exit_idx, min_dist_between_stops):
+                        continue
+                    indices.append(c)
+            else:
+                sub_dists = self.v_distances[vid][1][c:close_dist_indices[i + 1]]  # distance between current and next index
+                if len(sub_dists) > 0 and max(sub_dists) >= min_dist_between_stops:
+                    indices.append(c)
+                    found_stop = 1
+                    trim_to_idx = close_dist_indices[i + 1]
+
+        # print("f1: "+str(len(tmp_indices_1)))
+        # print(list(self.v_distances))
+        # print(len(self.v_distances[vid]))
+        # print(len(self.v_distances[vid][1]))
+        # print("f2: "+str(len(tmp_indices_2)))
+        # print("f3: "+str(len(close_dist_indices)))
+        # print("f4: "+str(len(indices)))
+
+        departures = []
+        for c in indices:
+            # find the first index for which position is greater than radius
+            npl = np.array(self.v_distances[vid][1][c:])
+            cur_radius = npl[0] + stop_radius  # minimum plus radius
+            radius_idx = np.argmax(npl > cur_radius)
+            depart_time = self.v_distances[vid][0][c]
+            depart_dist = self.v_distances[vid][1][c]
+            if radius_idx > 0:
+                radius_idx -= 1  # we want index within radius not outside
+                depart_time = self.v_distances[vid][0][c + radius_idx]
+                depart_dist = self.v_distances[vid][1][c + radius_idx]
+                if interpolate:  # estimate when the radius was crossed instead of reporting the last sample within it
+                    depart_time = crossing_time(self.v_distances[vid][0], self.v_distances[vid][1], c + radius_idx, cur_radius)
+                    depart_dist = float(cur_radius)
+
+            self.observed_departures.append(depart_time)
+            if self.shape is not None:
+                self.departure_progress[vid] = self.v_distances[vid][2][c]
+            departures.append([datetime.fromtimestamp(depart_time / 1000).strftime("%c"),
+                               depart_dist,
+                               depart_time])
+            # if a departure was found - update timetable
+            if self.schedule is None:
+                print("schedule is now None")
+            self.schedule.add_departure(vid, depart_time)
+
+        # lastly, clean distances up until this departure to prepare for the next round
+        if found_stop:
+            # print("resetting v_distances: ",vid,self.id)
+            # print("before:",self.v_distances[vid][1])
+            self.v_distances[vid] = [x[trim_to_idx:] for x in self.v_distances[vid]]
+            # print("after: ",self.v_distances[vid][1])
+
+        # if departure is found - record it and remove the vehicle record up to this point
+        return departures
+
+    def get_delta(self, t1, t2):
+        ct1 = datetime.combine(date.today(), t1)
+        ct2 = datetime.combine(date.today(), t2)
+        td = (ct1 - ct2).total_seconds()
+        return td
+
+    def _closest(self, l1, l2, res, max_delta, recycle=False, future_only=False):
+        if len(l1) == 0 or len(l2) == 0:
+            return res
+        p = None
+        if not future_only:
+            p = product(l1, l2)
+        else:
+            p = [x for x in list(product(l1, l2)) if x[0] <= x[1]]
+            if len(p) == 0:
+                return res
+
+        cl = min(p, key=lambda t: abs(self.get_delta(t[0], t[1])))
+        if abs(self.get_delta(cl[0], cl[1])) > max_delta:
+            for x in l1:
+                res.append((x, 0))
+            return res
+
+        else:
+            res.append(cl)
+            t1 = [x for x in l1]
+            t1.remove(cl[0])
+            t2 = [x for x in l2]
+            if not recycle:
+                t2.remove(cl[1])
+            self._closest(t1, t2, res, max_delta, recycle, future_only)
+
+    def prune(self, cutoff, min_dist_to_stop, inactive_time=3600):
+        # drop vehicles that have not reported for inactive_time seconds and samples older than cutoff (ms)
+        # only samples before the first one close to the stop are dropped and the sample right before that is kept
+        # so detection continues exactly as if nothing was removed
+        cur_ts = datetime.timestamp(datetime.now()) * 1000
+        for vid in list(self.v_distances):
+            data = self.v_distances[vid]
+            if len(data[0]) == 0 or cur_ts - data[0][-1] > inactive_time * 1000:
+                del self.v_distances[vid]
+                self.departure_progress.pop(vid, None)
+                continue
+
+            trim_idx = bisect_left(data[0], cutoff)
+            for i in range(trim_idx):
+                if data[1][i] < min_dist_to_stop:
+                    trim_idx = i
+                    break
+            if trim_idx > 1:
+                self.v_distances[vid] = [x[trim_idx - 1:] for x in data]
+
+        self.observed_departures = [x for x in self.observed_departures if x >= cutoff]
+
+    def get_late(self):
+        return self.schedule.get_late()
+
+    def get_last_departure(self):
+        self.schedule.get_last_departure()
+
+    def get_datetimes(self, sdate):
+        return self.schedule.get_datetimes(sdate)
+
+    def set_schedule(self, week, sat, sun):
+        self.schedule = Schedule(week, sat, sun)
+
+    def set_timetable(self, timetable, stop, route=None):
+        self.schedule.set_timetable(timetable, stop, route)
+
+    def set_day_start(self, day_start):
+        self.schedule.set_day_start(day_start)
+
+    def seal(self, sdate, evict_before):
+        self.schedule.seal(sdate)
+        self.schedule.evict(evict_before)
+
+    def set_shape(self, shape):
+        self.shape = shape
+
+    def get_position(self):
+        return self.position
+
+    def get_code(self):
+        return self.code
+
+    def get_name(self):
+        return self.name
+
+    def get_today_json(self):
+        return self.schedule.get_today_json()
@@ -0,0 +1,195 @@
+import sys
+import json
+import time
+import argparse
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .feed import FeedArchive
+
+# local stand-in for the feed serving a recorded archive - point the collector at it with --feed_url http://host:port/3
+# the archive is replayed at the requested speed and can be amplified for load testing:
+#   - each vehicle is cloned n_vehicles times - clone k reports where the original was k * clone_lag seconds earlier
+#     so clones are spread along the route instead of moving in lockstep
+#   - each route is cloned n_routes times - clones get " #k" appended to their long name so a collector can be pointed at them
+# clone k of id x gets the id x * 1000 + k (the original keeps its id) - vehicle clones are numbered across both
+# vehicle timestamps are rebased to the current time by default - recorded ones look inactive to the collector and slow its polling
+# when they are kept - clones are shifted forward by their lag and every loop shifts them forward by one archive length
+# so that the collector keeps accepting them
+# messages posted to {url}/api/chat.postMessage are accepted and dropped - point the collector at it with --slack_url http://host:port/api/
+
+
+def clone_id(x, k):
+    return x if k == 0 else x * 1000 + k
+
+
+class FeedReplay:
+    def __init__(self, archive, speed=1, n_vehicles=1, n_routes=1, clone_lag=60, rebase=True, loop=False):
+        self.archive = archive
+        self.speed = speed
+        self.n_vehicles = n_vehicles
+        self.n_routes = n_routes
+        self.clone_lag = clone_lag * 1000
+        self.rebase = rebase  # shift vehicle timestamps so that they look current
+        self.loop = loop  # start over once the end of the archive is reached
+
+        self.first, self.last = archive.get_range()
+        self.period = self.last - self.first + 1000  # one second past the last record before starting over
+        self.start = time.time() * 1000
+        self.n_posts = 0  # number of messages received on the slack endpoint
+
+    def get_time(self):  # archive time corresponding to now and the shift of vehicle timestamps due to looping
+        res = (time.time() * 1000 - self.start) * self.speed
+        if not self.loop:
+            return self.first + res, 0
+        return self.first + res % self.period, (res // self.period) * self.period
+
+    def clone_routes(self, routes):
+        res = []
+        for k in range(self.n_routes):
+            for r in routes:
+                r = dict(r)
+                r["id"] = clone_id(r["id"], k)
+                if k > 0 and "long_name" in r:
+                    r["long_name"] = r["long_name"] + " #" + str(k)
+                res.append(r)
+        return res
+
+    def get_vehicle_statuses(self, cur_time, shift):
+        if self.n_vehicles == 1 and self.n_routes == 1 and not self.rebase and shift == 0:
+            return self.archive.get("vehicle_statuses", cur_time)
+
+        output = json.loads(self.archive.get("vehicle_statuses", cur_time))
+        vehicles = []
+        for vk in range(self.n_vehicles):
+            vk_vehicles = output["vehicles"] if vk == 0 else json.loads(self.archive.get("vehicle_statuses", cur_time - vk * self.clone_lag))["vehicles"]
+            for rk in range(self.n_routes):
+                for v in vk_vehicles:
+                    v = dict(v)
+                    v["id"] = clone_id(v["id"], vk * self.n_routes + rk)
+                    v["route_id"] = clone_id(v["route_id"], rk)
+                    if self.rebase:
+                        v["timestamp"] = int(v["timestamp"] + time.time() * 1000 - cur_time + vk * self.clone_lag)
+                    else:
+                        v["timestamp"] = int(v["timestamp"] + shift + vk * self.clone_lag)
+                    vehicles.append(v)
+        output["vehicles"] = vehicles
+        return json.dumps(output)
+
+    def get(self, endpoint):
+        cur_time, shift = self.get_time()
+        if endpoint == "vehicle_statuses":
+            return self.get_vehicle_statuses(cur_time, shift)
+
+        body = self.archive.get(endpoint, cur_time)
+        if body is None or self.n_routes == 1:
+            return body
+
+        # stops and segments list the routes they belong to - routes lists the routes themselves
+        output = json.loads(body)
+        output["routes"] = self.clone_routes(output.get("routes", []))
+        return json.dumps(output)
+
+
+def make_handler(replay):
+    class FeedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            endpoint = urlparse(self.path).path.rstrip("/").split("/")[-1]
+            body = replay.get(endpoint)
+            if body is None:
+                self.send_error(404, "endpoint not in the archive: " + endpoint)
+                return
+
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):  # stand-in for slack so that load tests do not post to real channels
+            if not urlparse(self.path).path.endswith("chat.postMessage"):
+                self.send_error(404, "only chat.postMessage is supported")
+                return
+
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            replay.n_posts += 1
+            data = json.dumps({"ok": True, "ts": str(time.time())}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):  # one line per request would dominate the load test
+            return
+
+    return FeedHandler
+
+
+def run_stub(args):
+    archive = FeedArchive(args.archive).load()
+    replay = FeedReplay(archive, args.speed, args.vehicles, args.routes, args.clone_lag, args.rebase, args.loop)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(replay))
+    print("serving {0} ({1}) at http://{2}:{3}/3".format(args.archive, ",".join(archive.get_endpoints()), args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("received {0} slack messages".format(replay.n_posts))
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='''Serve a recorded feed archive''')
+    parser.add_argument("archive",
+                        type=str,
+                        help="Archive recorded with python -m translacc.record")
+    parser.add_argument("--host",
+                        required=False,
+                        type=str,
+                        default="127.0.0.1",
+                        help="Address to listen on.")
+    parser.add_argument("--port",
+                        required=False,
+                        type=int,
+                        default=8000,
+                        help="Port to listen on.")
+    parser.add_argument("--speed",
+                        required=False,
+                        type=float,
+                        default=1,
+                        help="Replay speed. 1 replays in real time, 100 replays 100 seconds of the archive every second.")
+    parser.add_argument("--vehicles",
+                        required=False,
+                        type=int,
+                        default=1,
+                        help="Number of copies of each vehicle to serve (including the original).")
+    parser.add_argument("--routes",
+                        required=False,
+                        type=int,
+                        default=1,
+                        help="Number of copies of each route to serve (including the original). Vehicles are copied onto every route copy.")
+    parser.add_argument("--clone_lag",
+                        required=False,
+                        type=float,
+                        default=60,
+                        help="Number of seconds by which each vehicle copy lags behind the previous one.")
+    parser.add_argument("--no_rebase",
+                        required=False,
+                        action="store_false",
+                        dest="rebase",
+                        help="Serve the recorded vehicle timestamps instead of shifting them to the current time. The collector considers vehicles that have not reported for 10 minutes inactive and polls slowly, so this is only useful for inspecting the archive as recorded.")
+    parser.add_argument("--loop",
+                        required=False,
+                        action="store_true",
+                        help="Start over when the end of the archive is reached. Vehicle timestamps are shifted forward by the length of the archive on every pass.")
+
+    parser.set_defaults(func=run_stub)
+    args = parser.parse_args(args)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,49 @@
+import numpy as np
+from bisect import bisect_left
+
+class Vehicle:
+    def __init__(self, vid, route_id,name):
+        self.vid = vid
+        self.route_id = route_id
+        self.name = name
+        self.travel = []
+
+        self.along = None  # last along-route position on the route shape
+        self.progress = None  # along-route distance travelled - does not wrap around on loop routes
+
+    def update(self, timestamp, position):
+        if len(self.travel) == 0 or timestamp > self.travel[-1][0]:
+            self.travel.append((timestamp, position))
+            return True
+        return False
+
+    def prune(self, cutoff):  # drop positions older than cutoff (ms) - the last one is always kept to reject stale updates
+        keep = min(bisect_left([x[0] for x in self.travel], cutoff), len(self.travel) - 1)
+        if keep > 0:
+            self.travel = self.travel[keep:]
+
+    def update_progress(self, shape, position):
+        seg, along, offset = shape.project(position, self.along)
+        if self.along is None:
+            self.progress = along
+        else:
+            self.progress += shape.delta(self.along, along)
+        self.along = along
+        return self.progress
+
+    def get_last_timestamp(self):
+        if len(self.travel) == 0:
+            return None
+        return self.travel[-1][0]
+
+    def get_report_interval(self, n=10):  # median number of seconds between the last n reports of the vehicle
+        if len(self.travel) < 2:
+            return None
+        tss = [x[0] for x in self.travel[-(n + 1):]]
+        return float(np.median(np.diff(tss))) / 1000
+
+    def get_id(self):
+        return self.vid
+
+    def get_name(self):
+        return self.name